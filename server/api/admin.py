@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import Song, Sleeve, SleeveSong, OwnedSong
+from django.db import transaction
+from .models import Song, Sleeve, SleeveSong, SleeveVersion, OwnedSong, LedgerEntry, CatalogArtist, SongPreview, SleeveRefreshRun, SleeveRefreshCheckpoint
+from .sleeve_catalog import refresh_sleeves_payload
+
+
+class RefreshSleevesPayloadMixin:
+    """Rebuild the cached sleeves payload after admin edits instead of waiting for the next reader."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        transaction.on_commit(refresh_sleeves_payload)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        transaction.on_commit(refresh_sleeves_payload)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(refresh_sleeves_payload)
 
 
 @admin.register(Song)
@@ -9,14 +27,20 @@ class SongAdmin(admin.ModelAdmin):
 
 
 @admin.register(Sleeve)
-class SleeveAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'genre', 'cost', 'refreshed_weekly')
+class SleeveAdmin(RefreshSleevesPayloadMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'genre', 'cost', 'refreshed_weekly', 'active_version')
     search_fields = ('name', 'id')
 
 
+@admin.register(SleeveVersion)
+class SleeveVersionAdmin(RefreshSleevesPayloadMixin, admin.ModelAdmin):
+    list_display = ('sleeve', 'number', 'created_at', 'published_at')
+    list_filter = ('sleeve',)
+
+
 @admin.register(SleeveSong)
-class SleeveSongAdmin(admin.ModelAdmin):
-    list_display = ('sleeve', 'song', 'rarity', 'weight')
+class SleeveSongAdmin(RefreshSleevesPayloadMixin, admin.ModelAdmin):
+    list_display = ('sleeve', 'version', 'song', 'rarity', 'weight')
     search_fields = ('sleeve__id', 'song__title')
 
 
@@ -24,3 +48,42 @@ class SleeveSongAdmin(admin.ModelAdmin):
 class OwnedSongAdmin(admin.ModelAdmin):
     list_display = ('song', 'rarity', 'owner', 'obtained_at')
     search_fields = ('song__title', 'owner__username')
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'reason', 'wallet_delta', 'xp_delta', 'reference', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('user__username', 'reference')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CatalogArtist)
+class CatalogArtistAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key', 'spotify_artist_id', 'track_count', 'refreshed_at')
+    search_fields = ('name', 'key', 'spotify_artist_id')
+
+
+@admin.register(SongPreview)
+class SongPreviewAdmin(admin.ModelAdmin):
+    list_display = ('song', 'preview_url', 'source', 'resolved_at')
+    search_fields = ('song__id', 'song__title', 'song__artist')
+    raw_id_fields = ('song',)
+
+
+@admin.register(SleeveRefreshRun)
+class SleeveRefreshRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'market', 'local_only', 'started_at', 'finished_at')
+    list_filter = ('status',)
+
+
+@admin.register(SleeveRefreshCheckpoint)
+class SleeveRefreshCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('run', 'genre', 'stage', 'version', 'updated_at')
+    list_filter = ('stage',)
+    raw_id_fields = ('run', 'version')
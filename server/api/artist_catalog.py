@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import rate_limit
+from .matching import normalize_artist_text
+from .models import ArtistCatalogTrack, CatalogArtist
+from .preview import AppleTrackData, search_artist_song_candidates
+from .spotify import SpotifyClient, SpotifyTrackData
+
+CATALOG_APPLE_LIMIT = 120
+CATALOG_SPOTIFY_LIMIT = 100
+CATALOG_MAX_AGE = timedelta(days=7)
+
+
+def _apple_track_from_row(row: ArtistCatalogTrack) -> AppleTrackData:
+    return AppleTrackData(
+        track_id=row.provider_track_id,
+        title=row.title,
+        artist=row.artist_name,
+        cover_url=row.cover_url,
+        genre=row.genre,
+        track_view_url=row.url,
+    )
+
+
+def _spotify_track_from_row(row: ArtistCatalogTrack) -> SpotifyTrackData:
+    artist_ids = tuple(artist_id for artist_id in row.artist_ids.split(",") if artist_id)
+    return SpotifyTrackData(
+        track_id=row.provider_track_id,
+        title=row.title,
+        artist=row.artist_name,
+        artist_ids=artist_ids,
+        cover_url=row.cover_url,
+        spotify_url=row.url,
+        primary_artist_id=artist_ids[0] if artist_ids else None,
+    )
+
+
+def catalog_candidates(artist_keyword: str, artist_id: str = "") -> tuple[list[AppleTrackData], list[SpotifyTrackData]]:
+    """
+    Look the artist up in the local index and return (apple, spotify) candidates in catalog order.
+    Both lists are empty when the artist has not been indexed yet.
+    """
+    key = normalize_artist_text(artist_keyword)
+    lookup = Q()
+    if key:
+        lookup |= Q(key=key)
+    if artist_id:
+        lookup |= Q(spotify_artist_id=artist_id)
+    if not lookup:
+        return [], []
+
+    artist = CatalogArtist.objects.filter(lookup, track_count__gt=0).order_by('-refreshed_at').first()
+    if artist is None:
+        return [], []
+
+    apple: list[AppleTrackData] = []
+    spotify: list[SpotifyTrackData] = []
+    for row in artist.tracks.order_by('provider', 'position'):
+        if row.provider == 'apple':
+            apple.append(_apple_track_from_row(row))
+        else:
+            spotify.append(_spotify_track_from_row(row))
+    return apple, spotify
+
+
+def _resolve_spotify_artist_id(spotify_client: SpotifyClient, name: str) -> str | None:
+    key = normalize_artist_text(name)
+    for artist in spotify_client.search_artists(name, limit=5):
+        if normalize_artist_text(artist.name) == key:
+            return artist.artist_id
+    return None
+
+
+def refresh_artist_catalog(
+    name: str,
+    *,
+    spotify_client: SpotifyClient | None = None,
+    spotify_artist_id: str | None = None,
+    apple_limit: int = CATALOG_APPLE_LIMIT,
+    spotify_limit: int = CATALOG_SPOTIFY_LIMIT,
+) -> CatalogArtist | None:
+    """Fetch one artist from the providers and replace its rows in the index."""
+    key = normalize_artist_text(name)
+    if not key:
+        return None
+
+    apple_tracks = search_artist_song_candidates(name, limit=apple_limit, lane=rate_limit.LANE_BATCH)
+    spotify_tracks: list[SpotifyTrackData] = []
+    if spotify_client is not None and spotify_client.is_configured:
+        spotify_artist_id = spotify_artist_id or _resolve_spotify_artist_id(spotify_client, name)
+        if spotify_artist_id:
+            spotify_tracks = spotify_client.get_artist_catalog_tracks(spotify_artist_id, limit=spotify_limit)
+
+    rows = [
+        ArtistCatalogTrack(
+            provider='apple',
+            position=position,
+            provider_track_id=track.track_id,
+            title=track.title,
+            artist_name=track.artist,
+            cover_url=track.cover_url,
+            genre=track.genre,
+            url=track.track_view_url,
+        )
+        for position, track in enumerate(apple_tracks)
+    ]
+    rows.extend(
+        ArtistCatalogTrack(
+            provider='spotify',
+            position=position,
+            provider_track_id=track.track_id,
+            title=track.title or '',
+            artist_name=track.artist or '',
+            cover_url=track.cover_url,
+            url=track.spotify_url,
+            artist_ids=",".join(track.artist_ids),
+        )
+        for position, track in enumerate(spotify_tracks)
+    )
+
+    with transaction.atomic():
+        artist, _ = CatalogArtist.objects.select_for_update().get_or_create(key=key, defaults={'name': name})
+        if not rows and artist.track_count:
+            # Providers came back empty (often an outage); keep the rows we already have.
+            return artist
+
+        artist.tracks.all().delete()
+        for row in rows:
+            row.artist = artist
+        ArtistCatalogTrack.objects.bulk_create(rows)
+
+        artist.name = name
+        artist.spotify_artist_id = spotify_artist_id or artist.spotify_artist_id
+        artist.track_count = len(rows)
+        artist.refreshed_at = timezone.now()
+        artist.save()
+    return artist
+
+
+def stale_catalog_artists(max_age: timedelta = CATALOG_MAX_AGE):
+    cutoff = timezone.now() - max_age
+    return CatalogArtist.objects.filter(Q(refreshed_at__isnull=True) | Q(refreshed_at__lt=cutoff)).order_by('refreshed_at')
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+CANDIDATE_CACHE_FRESH_SECONDS = int(os.environ.get("REROLL_CANDIDATE_CACHE_FRESH_SECONDS", "21600"))
+CANDIDATE_CACHE_STALE_SECONDS = int(os.environ.get("REROLL_CANDIDATE_CACHE_STALE_SECONDS", "604800"))
+CANDIDATE_CACHE_NEGATIVE_SECONDS = int(os.environ.get("REROLL_CANDIDATE_CACHE_NEGATIVE_SECONDS", "300"))
+CANDIDATE_REFRESH_LOCK_SECONDS = 60
+
+# A loader returns the ranked candidate list, or None when the lookup failed and
+# nothing should be cached (e.g. the provider rate limited us).
+CandidateLoader = Callable[[], list[Any] | None]
+
+
+def normalize_artist_keyword(artist_keyword: str) -> str:
+    return " ".join((artist_keyword or "").casefold().split())
+
+
+def _candidate_cache_key(source: str, artist_keyword: str) -> str:
+    digest = hashlib.sha1(normalize_artist_keyword(artist_keyword).encode("utf-8")).hexdigest()
+    return f"reroll:candidates:{source}:{digest}"
+
+
+def _refresh_lock_key(cache_key: str) -> str:
+    return f"{cache_key}:refreshing"
+
+
+def _store(cache_key: str, candidates: list[Any]) -> None:
+    entry = {"fetched_at": time.time(), "candidates": list(candidates)}
+    if candidates:
+        timeout = CANDIDATE_CACHE_FRESH_SECONDS + CANDIDATE_CACHE_STALE_SECONDS
+    else:
+        timeout = CANDIDATE_CACHE_NEGATIVE_SECONDS
+    cache.set(cache_key, entry, timeout=timeout)
+
+
+def _refresh_in_background(cache_key: str, loader: CandidateLoader) -> None:
+    def run() -> None:
+        try:
+            candidates = loader()
+            if candidates is not None:
+                _store(cache_key, candidates)
+        except Exception:
+            # Keep serving the stale list; the next reader past the lock will try again.
+            pass
+        finally:
+            cache.delete(_refresh_lock_key(cache_key))
+
+    threading.Thread(target=run, name="reroll-candidate-refresh", daemon=True).start()
+
+
+def cached_artist_candidates(
+    source: str,
+    artist_keyword: str,
+    loader: CandidateLoader,
+    *,
+    refresh_loader: CandidateLoader | None = None,
+) -> list[Any]:
+    """
+    Return the ranked candidate list for an artist keyword, in the order the provider ranked it.
+    Fresh entries are served as-is, stale ones are served while one background thread
+    refreshes them, and empty results are remembered briefly so misses stay cheap.
+    refresh_loader, when given, is used for the background refresh instead of loader
+    (e.g. when loader is bound to the current request's deadline).
+    """
+    cache_key = _candidate_cache_key(source, artist_keyword)
+    entry = cache.get(cache_key)
+    if entry is not None:
+        candidates = entry["candidates"]
+        age = time.time() - entry["fetched_at"]
+        if candidates and age > CANDIDATE_CACHE_FRESH_SECONDS:
+            if cache.add(_refresh_lock_key(cache_key), True, timeout=CANDIDATE_REFRESH_LOCK_SECONDS):
+                _refresh_in_background(cache_key, refresh_loader or loader)
+        return list(candidates)
+
+    candidates = loader()
+    if candidates is None:
+        return []
+    _store(cache_key, candidates)
+    return list(candidates)
@@ -0,0 +1,113 @@
+import os
+import time
+
+from django.core.cache import cache
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_FAILURE_WINDOW_SECONDS = int(os.environ.get("CIRCUIT_FAILURE_WINDOW_SECONDS", "30"))
+CIRCUIT_OPEN_SECONDS = int(os.environ.get("CIRCUIT_OPEN_SECONDS", "30"))
+# Successful half-open probes needed before the circuit closes again.
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get("CIRCUIT_HALF_OPEN_PROBES", "2"))
+# Longest a single probe may hold the half-open slot before another worker may try.
+CIRCUIT_PROBE_LEASE_SECONDS = int(os.environ.get("CIRCUIT_PROBE_LEASE_SECONDS", "20"))
+
+# Endpoints with their own breaker. One failing endpoint does not stop calls to the others.
+SPOTIFY_SEARCH = ("spotify", "search")
+SPOTIFY_TRACKS = ("spotify", "tracks")
+SPOTIFY_ALBUMS = ("spotify", "albums")
+ITUNES_SEARCH = ("itunes", "search")
+
+
+def _key(provider: str, endpoint: str, part: str) -> str:
+    return f"circuit:{provider}:{endpoint}:{part}"
+
+
+def _opened_at(provider: str, endpoint: str) -> float | None:
+    value = cache.get(_key(provider, endpoint, "opened"))
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def open_seconds_remaining(provider: str, endpoint: str) -> int:
+    """Seconds until an open circuit lets a probe through; 0 when closed or half-open."""
+    opened_at = _opened_at(provider, endpoint)
+    if opened_at is None:
+        return 0
+    return max(0, int(opened_at + CIRCUIT_OPEN_SECONDS - time.time() + 0.999))
+
+
+def is_open(provider: str, endpoint: str) -> bool:
+    """True while calls are being refused. Half-open counts as open for callers choosing a fallback."""
+    return _opened_at(provider, endpoint) is not None
+
+
+def allow_request(provider: str, endpoint: str) -> bool:
+    """
+    Closed: always allowed. Open: refused until CIRCUIT_OPEN_SECONDS have passed.
+    Half-open: one probe at a time across every worker; everyone else keeps failing fast.
+    """
+    opened_at = _opened_at(provider, endpoint)
+    if opened_at is None:
+        return True
+    if time.time() < opened_at + CIRCUIT_OPEN_SECONDS:
+        return False
+    return cache.add(_key(provider, endpoint, "probe"), True, timeout=CIRCUIT_PROBE_LEASE_SECONDS)
+
+
+def release_probe(provider: str, endpoint: str) -> None:
+    """Give the half-open slot back when the caller took it but never reached the provider."""
+    cache.delete(_key(provider, endpoint, "probe"))
+
+
+def _open(provider: str, endpoint: str) -> None:
+    # Outlive the open window so the half-open state survives until probes settle it.
+    ttl = CIRCUIT_OPEN_SECONDS + CIRCUIT_PROBE_LEASE_SECONDS * max(1, CIRCUIT_HALF_OPEN_PROBES) + 60
+    cache.set(_key(provider, endpoint, "opened"), time.time(), timeout=ttl)
+    cache.delete_many([
+        _key(provider, endpoint, "failures"),
+        _key(provider, endpoint, "probes"),
+        _key(provider, endpoint, "probe"),
+    ])
+
+
+def _incr(key: str, timeout: int) -> int:
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key expired between add and incr; start a new count.
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+def record_success(provider: str, endpoint: str) -> None:
+    if _opened_at(provider, endpoint) is None:
+        return
+    probes = _incr(_key(provider, endpoint, "probes"), CIRCUIT_OPEN_SECONDS + CIRCUIT_PROBE_LEASE_SECONDS)
+    if probes >= max(1, CIRCUIT_HALF_OPEN_PROBES):
+        cache.delete_many([
+            _key(provider, endpoint, "opened"),
+            _key(provider, endpoint, "probes"),
+            _key(provider, endpoint, "probe"),
+            _key(provider, endpoint, "failures"),
+        ])
+        return
+    # Free the slot so the next probe can go out straight away.
+    release_probe(provider, endpoint)
+
+
+def record_failure(provider: str, endpoint: str) -> None:
+    """Count a provider failure (5xx, timeout, connection error). 429s are the rate limiter's business."""
+    if _opened_at(provider, endpoint) is not None:
+        # A failed probe (or a straggler that started before the circuit opened) reopens it.
+        _open(provider, endpoint)
+        return
+    failures = _incr(_key(provider, endpoint, "failures"), CIRCUIT_FAILURE_WINDOW_SECONDS)
+    if failures >= max(1, CIRCUIT_FAILURE_THRESHOLD):
+        _open(provider, endpoint)
+
+
+def is_failure_status(status_code: int) -> bool:
+    return status_code >= 500
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import circuit_breaker
+from .models import Song
+from .preview import search_track_genre
+from .rate_limit import LANE_BATCH
+
+UNKNOWN_GENRE = 'Unknown'
+GENRE_ENRICHMENT_CONCURRENCY = int(os.environ.get("GENRE_ENRICHMENT_CONCURRENCY", "4"))
+GENRE_ENRICHMENT_BATCH_SIZE = int(os.environ.get("GENRE_ENRICHMENT_BATCH_SIZE", "25"))
+# Songs iTunes had no genre for are tried again after this long.
+GENRE_RECHECK_AFTER = timedelta(hours=float(os.environ.get("GENRE_RECHECK_AFTER_HOURS", "168")))
+
+
+def songs_missing_genre():
+    return Song.objects.filter(Q(genre__isnull=True) | Q(genre__in=(UNKNOWN_GENRE, '')))
+
+
+def songs_due_for_genre_lookup(recheck_after: timedelta = GENRE_RECHECK_AFTER):
+    cutoff = timezone.now() - recheck_after
+    return songs_missing_genre().filter(Q(genre_checked_at__isnull=True) | Q(genre_checked_at__lt=cutoff))
+
+
+def resolve_song_genres(
+    songs: list[Song],
+    *,
+    concurrency: int = GENRE_ENRICHMENT_CONCURRENCY,
+    lane: str = LANE_BATCH,
+) -> int:
+    """
+    Look genres up for these songs, a few at a time, and store the ones iTunes knows.
+    Only the lookups run in worker threads; the updates are written afterwards on this thread.
+    Returns the number of songs that got a genre.
+    """
+    if not songs:
+        return 0
+
+    def lookup(song: Song) -> str | None:
+        try:
+            return search_track_genre(song.title, song.artist, lane=lane)
+        except Exception:
+            return None
+
+    if concurrency <= 1 or len(songs) == 1:
+        genres = [lookup(song) for song in songs]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(songs)), thread_name_prefix="genre-lookup") as pool:
+            genres = list(pool.map(lookup, songs))
+
+    now = timezone.now()
+    resolved = 0
+    for song, genre in zip(songs, genres):
+        if genre:
+            # Conditional so a genre set in the meantime (admin edit, sleeve refresh) is never overwritten.
+            resolved += songs_missing_genre().filter(id=song.id).update(genre=genre, genre_checked_at=now)
+
+    unresolved_ids = [song.id for song, genre in zip(songs, genres) if not genre]
+    # With iTunes refused by its breaker an empty answer says nothing; leave those due for the next run.
+    if unresolved_ids and not circuit_breaker.is_open(*circuit_breaker.ITUNES_SEARCH):
+        Song.objects.filter(id__in=unresolved_ids).update(genre_checked_at=now)
+    return resolved
+
+
+class GenreEnricher:
+    """
+    One background thread per process that resolves genres for songs inserted as 'Unknown'.
+    Ids are de-duplicated while queued and looked up in batches in the batch rate-limit lane.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = GENRE_ENRICHMENT_BATCH_SIZE,
+        linger_seconds: float = 0.5,
+        max_pending: int = 5000,
+    ) -> None:
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.max_pending = max_pending
+        self._pending: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def enqueue(self, song_ids: list[str]) -> None:
+        if not song_ids:
+            return
+        with self._lock:
+            for song_id in song_ids:
+                if len(self._pending) >= self.max_pending:
+                    break
+                self._pending[song_id] = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="genre-enricher", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _next_batch(self) -> list[str]:
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[0])
+            if not self._pending:
+                self._wakeup.clear()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.linger_seconds)
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                resolve_song_genres(list(songs_due_for_genre_lookup().filter(id__in=batch)))
+            except Exception:
+                # Anything left unresolved is picked up by backfill_song_genres.
+                pass
+            finally:
+                close_old_connections()
+
+
+_ENRICHER = GenreEnricher()
+
+
+def queue_genre_lookup(song: Song) -> None:
+    """Resolve the song's genre in the background once the surrounding transaction commits."""
+    if song.genre and song.genre != UNKNOWN_GENRE:
+        return
+    # A recent miss is not retried until GENRE_RECHECK_AFTER has passed.
+    if song.genre_checked_at and song.genre_checked_at >= timezone.now() - GENRE_RECHECK_AFTER:
+        return
+    transaction.on_commit(lambda: _ENRICHER.enqueue([song.id]))
@@ -0,0 +1,148 @@
+import http.client
+import io
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from email.message import Message
+from urllib import error, parse, request
+
+HTTP_POOL_MAXSIZE = int(os.environ.get("PROVIDER_HTTP_POOL_MAXSIZE", "8"))
+HTTP_POOL_ACQUIRE_TIMEOUT_SECONDS = float(os.environ.get("PROVIDER_HTTP_POOL_ACQUIRE_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_REDIRECTS = 3
+
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Errors that mean a kept-alive socket was closed by the server while it sat in the pool.
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+@dataclass
+class PooledResponse:
+    status: int
+    headers: Message
+    body: bytes
+
+    def read(self) -> bytes:
+        return self.body
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+class HostPool:
+    """Keep-alive connections to one scheme/host/port. At most maxsize are in use or idle at once."""
+
+    def __init__(self, scheme: str, host: str, port: int | None, maxsize: int) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+
+    def _new_connection(self, timeout: float | None) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def acquire(self, timeout: float | None) -> tuple[http.client.HTTPConnection, bool]:
+        if not self._slots.acquire(timeout=HTTP_POOL_ACQUIRE_TIMEOUT_SECONDS):
+            raise error.URLError(f"connection pool for {self.host} exhausted")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._new_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def release(self, conn: http.client.HTTPConnection, *, reusable: bool) -> None:
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_POOLS: dict[tuple[str, str, int | None], HostPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool_for(url: parse.SplitResult) -> HostPool:
+    key = (url.scheme, url.hostname or "", url.port)
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.setdefault(key, HostPool(url.scheme, url.hostname or "", url.port, HTTP_POOL_MAXSIZE))
+    return pool
+
+
+def close_all_pools() -> None:
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+
+
+def _send(pool: HostPool, req: request.Request, path: str, timeout: float | None) -> tuple[http.client.HTTPResponse, bytes]:
+    headers = {key: value for key, value in req.header_items()}
+    headers.setdefault("Connection", "keep-alive")
+    # A pooled socket may have been closed by the server while idle; retry once on a fresh one.
+    for attempt in range(2):
+        conn, reused = pool.acquire(timeout)
+        try:
+            conn.request(req.get_method(), path, body=req.data, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except _STALE_CONNECTION_ERRORS as exc:
+            pool.release(conn, reusable=False)
+            if reused and attempt == 0:
+                continue
+            raise error.URLError(exc) from exc
+        except TimeoutError:
+            pool.release(conn, reusable=False)
+            raise
+        except (http.client.HTTPException, OSError) as exc:
+            pool.release(conn, reusable=False)
+            raise error.URLError(exc) from exc
+        except BaseException:
+            # Anything else (bad header values, KeyboardInterrupt) must still give the slot back.
+            pool.release(conn, reusable=False)
+            raise
+        pool.release(conn, reusable=not resp.will_close)
+        return resp, body
+    raise error.URLError("connection retry exhausted")
+
+
+def urlopen(req: request.Request, timeout: float | None = None) -> PooledResponse:
+    """
+    Drop-in for urllib.request.urlopen that reuses keep-alive connections per host.
+    Raises the same urllib error types (HTTPError, URLError, TimeoutError), so callers keep their handlers.
+    """
+    for _ in range(HTTP_MAX_REDIRECTS + 1):
+        url = parse.urlsplit(req.full_url)
+        if url.scheme not in ("http", "https"):
+            raise error.URLError(f"unsupported scheme {url.scheme!r}")
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+
+        resp, body = _send(_pool_for(url), req, path, timeout)
+        location = resp.getheader("Location")
+        if resp.status in _REDIRECT_STATUSES and location:
+            req = request.Request(parse.urljoin(req.full_url, location), headers=dict(req.header_items()), method="GET")
+            continue
+        if resp.status >= 400:
+            raise error.HTTPError(req.full_url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return PooledResponse(status=resp.status, headers=resp.headers, body=body)
+    raise error.URLError(f"too many redirects for {req.full_url}")
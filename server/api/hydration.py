@@ -0,0 +1,280 @@
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any
+
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import circuit_breaker
+from .local_lru import LocalLRU
+from .models import Song
+from .rate_limit import LANE_BATCH
+from .spotify import SpotifyClient
+
+DEFAULT_TRACK_CACHE_TTL = int(os.environ.get("SPOTIFY_TRACK_CACHE_TTL_SECONDS", "3600"))
+TRACK_CACHE_STALE_SECONDS = int(os.environ.get("SPOTIFY_TRACK_CACHE_STALE_SECONDS", "3600"))
+# Spread expiries over a few TTL buckets so a burst of hydrations does not expire all at once.
+TRACK_CACHE_TTL_JITTER = float(os.environ.get("SPOTIFY_TRACK_CACHE_TTL_JITTER", "0.1"))
+TRACK_CACHE_TTL_BUCKETS = 4
+TRACK_NEGATIVE_CACHE_TTL = int(os.environ.get("SPOTIFY_TRACK_NEGATIVE_CACHE_TTL_SECONDS", "600"))
+SPOTIFY_UNRESOLVABLE_AFTER_MISSES = int(os.environ.get("SPOTIFY_UNRESOLVABLE_AFTER_MISSES", "5"))
+HYDRATION_L1_MAX_ENTRIES = int(os.environ.get("HYDRATION_L1_MAX_ENTRIES", "5000"))
+HYDRATION_L1_TTL_SECONDS = int(os.environ.get("HYDRATION_L1_TTL_SECONDS", "60"))
+
+
+_L1 = LocalLRU(HYDRATION_L1_MAX_ENTRIES, HYDRATION_L1_TTL_SECONDS)
+
+
+def _track_cache_key(track_id: str) -> str:
+    return f"spotify:track:{track_id}"
+
+
+# Cached in place of a payload when Spotify had no data for the track.
+MISSING_TRACK = {"_spotifyMissing": True}
+
+
+def _ttl_bucket(key: str, base_ttl: int) -> int:
+    if TRACK_CACHE_TTL_BUCKETS <= 1 or TRACK_CACHE_TTL_JITTER <= 0:
+        return base_ttl
+    bucket = zlib.crc32(key.encode("utf-8")) % TRACK_CACHE_TTL_BUCKETS
+    spread = (bucket / (TRACK_CACHE_TTL_BUCKETS - 1)) * 2 - 1
+    return max(1, int(base_ttl * (1 + TRACK_CACHE_TTL_JITTER * spread)))
+
+
+def cache_get_many(keys: list[str]) -> dict[str, Any]:
+    """L1 first, then a single get_many against the shared cache for whatever is left."""
+    found = _L1.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        shared = cache.get_many(missing)
+        _L1.set_many(shared)
+        found.update(shared)
+    return found
+
+
+def cache_set_many(values: dict[str, Any], base_ttl: int) -> None:
+    """One set_many per TTL bucket, so the round trips stay fixed however many keys are written."""
+    if not values:
+        return
+    _L1.set_many(values)
+    by_ttl: dict[int, dict[str, Any]] = {}
+    for key, value in values.items():
+        by_ttl.setdefault(_ttl_bucket(key, base_ttl), {})[key] = value
+    for ttl, bucket_values in by_ttl.items():
+        cache.set_many(bucket_values, timeout=ttl)
+
+
+def record_track_misses(track_ids: list[str]) -> None:
+    """Count a miss for each track and flag songs that keep missing so hydration stops asking."""
+    if not track_ids:
+        return
+    Song.objects.filter(spotify_track_id__in=track_ids).update(spotify_miss_count=F('spotify_miss_count') + 1)
+    Song.objects.filter(
+        spotify_track_id__in=track_ids,
+        spotify_miss_count__gte=SPOTIFY_UNRESOLVABLE_AFTER_MISSES,
+        spotify_unresolvable_at__isnull=True,
+    ).update(spotify_unresolvable_at=timezone.now())
+
+
+def record_track_hits(track_ids: list[str]) -> None:
+    if not track_ids:
+        return
+    Song.objects.filter(spotify_track_id__in=track_ids, spotify_miss_count__gt=0).update(
+        spotify_miss_count=0,
+        spotify_unresolvable_at=None,
+    )
+
+
+def _unresolvable_track_ids(track_ids: list[str]) -> set[str]:
+    return set(
+        Song.objects
+        .filter(spotify_track_id__in=track_ids, spotify_unresolvable_at__isnull=False)
+        .values_list('spotify_track_id', flat=True)
+    )
+
+
+def _track_payload(data, now: int) -> dict[str, Any]:
+    return {
+        "title": data.title,
+        "artist": data.artist,
+        "coverUrl": data.cover_url,
+        "spotifyUrl": data.spotify_url,
+        "spotifyTrackId": data.track_id,
+        "_spotifyCachedAt": now,
+    }
+
+
+def _apply_payload(song: dict[str, Any], payload: dict[str, Any]) -> None:
+    # Empty Spotify fields keep whatever the serializer already put on the row.
+    song.update({key: value for key, value in payload.items() if value})
+
+
+def _is_fresh(payload: dict[str, Any], now: float) -> bool:
+    return now - payload.get("_spotifyCachedAt", 0) < DEFAULT_TRACK_CACHE_TTL
+
+
+def fetch_and_cache_tracks(client: SpotifyClient, track_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """Fetch tracks from Spotify, cache hits and misses, and return the payloads by track id."""
+    unresolvable = _unresolvable_track_ids(track_ids)
+    # Negative-cache them too, or every read would find no entry and queue them again.
+    cache_set_many({_track_cache_key(track_id): MISSING_TRACK for track_id in unresolvable}, TRACK_NEGATIVE_CACHE_TTL)
+    track_ids = [track_id for track_id in track_ids if track_id not in unresolvable]
+    if not track_ids:
+        return {}
+
+    fetched = client.get_tracks(track_ids)
+    now = int(time.time())
+    payloads = {track_id: _track_payload(data, now) for track_id, data in fetched.items()}
+    # Only ids Spotify answered for count as misses; failed or throttled chunks are retried next time.
+    missing = list(client.last_missing_track_ids)
+
+    # Entries outlive their freshness by the stale window so readers have something to show during a refresh.
+    cache_set_many(
+        {_track_cache_key(track_id): payload for track_id, payload in payloads.items()},
+        DEFAULT_TRACK_CACHE_TTL + TRACK_CACHE_STALE_SECONDS,
+    )
+    cache_set_many({_track_cache_key(track_id): MISSING_TRACK for track_id in missing}, TRACK_NEGATIVE_CACHE_TTL)
+    record_track_hits(list(fetched))
+    record_track_misses(missing)
+    return payloads
+
+
+class HydrationRefresher:
+    """
+    One background thread per process that refreshes stale or missing tracks.
+    Ids are de-duplicated while queued and fetched in get_tracks-sized batches in the batch rate-limit lane.
+    """
+
+    def __init__(self, batch_size: int = 50, linger_seconds: float = 0.2, max_pending: int = 5000) -> None:
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.max_pending = max_pending
+        self._pending: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def enqueue(self, track_ids: list[str]) -> None:
+        if not track_ids:
+            return
+        with self._lock:
+            for track_id in track_ids:
+                if len(self._pending) >= self.max_pending:
+                    break
+                self._pending[track_id] = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="hydration-refresher", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _next_batch(self) -> list[str]:
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[0])
+            if not self._pending:
+                self._wakeup.clear()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Give concurrent requests a moment to add their ids to the same batch.
+            time.sleep(self.linger_seconds)
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                client = SpotifyClient(lane=LANE_BATCH)
+                if client.is_configured:
+                    fetch_and_cache_tracks(client, batch)
+            except Exception:
+                # A failed batch is simply retried the next time a reader finds it stale.
+                pass
+            finally:
+                close_old_connections()
+
+
+_REFRESHER = HydrationRefresher()
+
+
+def hydrate_songs_from_spotify(song_rows: list[dict[str, Any]], *, background: bool = False) -> list[dict[str, Any]]:
+    """
+    Fill human-readable song fields from Spotify and cache the resolved payload in Django cache.
+    Cache entries are intentionally short-lived to avoid persistent storage of Spotify metadata.
+    Entries are keyed by Spotify track id, so the same track shared by many rows is cached once.
+
+    With background=True nothing waits on Spotify: rows get whatever is cached (fresh or stale)
+    on top of the serializer's DB values, and stale or missing tracks go to the background refresher.
+    """
+    _hydrate(song_rows, background=background)
+    return song_rows
+
+
+def hydrate_songs_completely(song_rows: list[dict[str, Any]]) -> bool:
+    """
+    hydrate_songs_from_spotify in the foreground, reporting whether every track got a fresh Spotify
+    answer (a payload or a cached miss). False means some rows kept DB or stale values.
+    """
+    return _hydrate(song_rows, background=False)
+
+
+def _hydrate(song_rows: list[dict[str, Any]], *, background: bool) -> bool:
+    if not song_rows:
+        return True
+
+    client = SpotifyClient()
+    if not client.is_configured:
+        return False
+
+    positions_by_track_id: dict[str, list[int]] = {}
+    for idx, song in enumerate(song_rows):
+        track_id = song.get("spotifyTrackId")
+        if not song.get("id") or not track_id:
+            continue
+        positions_by_track_id.setdefault(track_id, []).append(idx)
+
+    if not positions_by_track_id:
+        return True
+
+    cached = cache_get_many([_track_cache_key(track_id) for track_id in positions_by_track_id])
+    now = time.time()
+    to_refresh: list[str] = []
+    for track_id, indices in positions_by_track_id.items():
+        payload = cached.get(_track_cache_key(track_id))
+        if not payload:
+            to_refresh.append(track_id)
+            continue
+        if payload.get("_spotifyMissing"):
+            continue
+        # Stale payloads are still applied so a failed refresh falls back to them.
+        for idx in indices:
+            _apply_payload(song_rows[idx], payload)
+        if not _is_fresh(payload, now):
+            to_refresh.append(track_id)
+
+    if not to_refresh:
+        return True
+    if background:
+        _REFRESHER.enqueue(to_refresh)
+        return False
+    if circuit_breaker.open_seconds_remaining(*circuit_breaker.SPOTIFY_TRACKS):
+        # Spotify tracks are down: serve the DB values and whatever was cached rather than wait on it.
+        return False
+
+    fetched = fetch_and_cache_tracks(client, to_refresh)
+    for track_id, payload in fetched.items():
+        for idx in positions_by_track_id[track_id]:
+            _apply_payload(song_rows[idx], payload)
+
+    unanswered = [_track_cache_key(track_id) for track_id in to_refresh if track_id not in fetched]
+    if not unanswered:
+        return True
+    # Misses were just negatively cached; anything else was a failed, throttled or refused chunk.
+    answered = cache_get_many(unanswered)
+    return all(answered.get(key, {}).get("_spotifyMissing") for key in unanswered)
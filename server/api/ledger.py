@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from .leveling import level_from_total_xp
+from .models import LedgerEntry, Profile
+
+MATERIALIZE_BATCH_SIZE = 500
+
+
+def record_entry(
+    user_id: int,
+    reason: str,
+    *,
+    wallet_delta: int = 0,
+    xp_delta: int = 0,
+    reference: str = '',
+) -> LedgerEntry:
+    return LedgerEntry.objects.create(
+        user_id=user_id,
+        reason=reason,
+        wallet_delta=wallet_delta,
+        xp_delta=xp_delta,
+        reference=reference[:200],
+    )
+
+
+def ledger_totals(user_ids: list[int]) -> dict[int, tuple[int, int]]:
+    rows = (
+        LedgerEntry.objects
+        .filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(wallet=Sum('wallet_delta'), xp=Sum('xp_delta'))
+    )
+    return {row['user_id']: (row['wallet'] or 0, row['xp'] or 0) for row in rows}
+
+
+def materialize_balances(user_ids: list[int] | None = None, *, batch_size: int = MATERIALIZE_BATCH_SIZE) -> int:
+    """
+    Rewrite Profile.wallet/xp/level from the ledger, one bulk UPDATE per batch of users.
+    Meant for rebuilds after incidents or bulk grants, not for the live request path.
+    """
+    profiles = Profile.objects.order_by('user_id')
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    all_user_ids = list(profiles.values_list('user_id', flat=True))
+
+    changed = 0
+    for start in range(0, len(all_user_ids), max(1, batch_size)):
+        batch_ids = all_user_ids[start:start + batch_size]
+        totals = ledger_totals(batch_ids)
+        to_update: list[Profile] = []
+        for profile in Profile.objects.filter(user_id__in=batch_ids).only('id', 'user_id', 'wallet', 'xp', 'level'):
+            wallet, total_xp = totals.get(profile.user_id, (0, 0))
+            level, xp = level_from_total_xp(total_xp)
+            if (profile.wallet, profile.xp, profile.level) == (wallet, xp, level):
+                continue
+            profile.wallet, profile.xp, profile.level = wallet, xp, level
+            to_update.append(profile)
+
+        if to_update:
+            with transaction.atomic():
+                Profile.objects.bulk_update(to_update, ['wallet', 'xp', 'level'])
+            changed += len(to_update)
+
+    return changed
@@ -0,0 +1,24 @@
+import math
+
+XP_PER_LEVEL_STEP = 500
+
+
+def xp_required_for_next_level(level: int) -> int:
+    return max(XP_PER_LEVEL_STEP, XP_PER_LEVEL_STEP * max(1, level))
+
+
+def total_xp_for(level: int, xp: int) -> int:
+    """Lifetime XP implied by a (level, xp-into-level) pair."""
+    completed_levels = max(1, int(level or 1)) - 1
+    return XP_PER_LEVEL_STEP * completed_levels * (completed_levels + 1) // 2 + max(0, int(xp or 0))
+
+
+def level_from_total_xp(total_xp: int) -> tuple[int, int]:
+    """
+    Closed-form inverse of total_xp_for: reaching level L takes STEP * L * (L - 1) / 2 XP,
+    so L is the largest integer with L * (L - 1) <= 2 * total / STEP.
+    """
+    total_xp = max(0, int(total_xp))
+    bound = 2 * total_xp // XP_PER_LEVEL_STEP
+    level = (1 + math.isqrt(1 + 4 * bound)) // 2
+    return level, total_xp - total_xp_for(level, 0)
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.genre_enrichment import (
+    GENRE_ENRICHMENT_CONCURRENCY,
+    GENRE_RECHECK_AFTER,
+    resolve_song_genres,
+    songs_due_for_genre_lookup,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Resolve genres for songs stored as 'Unknown'. Each batch is saved as it finishes and "
+        "looked-up songs are stamped, so an interrupted run picks up where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=GENRE_ENRICHMENT_CONCURRENCY)
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many songs (0 = no limit)')
+        parser.add_argument(
+            '--recheck-after-hours',
+            type=float,
+            default=GENRE_RECHECK_AFTER.total_seconds() / 3600,
+            help='Retry songs iTunes had no genre for once their last lookup is this old',
+        )
+        parser.add_argument('--start-after', default='', help='Skip song ids up to and including this one')
+
+    def handle(self, *args, **options):
+        due = songs_due_for_genre_lookup(timedelta(hours=options['recheck_after_hours'])).order_by('id')
+        batch_size = max(1, options['batch_size'])
+        limit = options['limit']
+        cursor = options['start_after']
+
+        checked = resolved = 0
+        while not limit or checked < limit:
+            page = due.filter(id__gt=cursor) if cursor else due
+            size = min(batch_size, limit - checked) if limit else batch_size
+            songs = list(page[:size])
+            if not songs:
+                break
+
+            resolved += resolve_song_genres(songs, concurrency=options['concurrency'])
+            checked += len(songs)
+            cursor = songs[-1].id
+            self.stdout.write(f"Checked {checked} song(s), {resolved} resolved (last id {cursor})")
+
+        self.stdout.write(self.style.SUCCESS(f"Genre backfill finished: {resolved} of {checked} song(s) resolved"))
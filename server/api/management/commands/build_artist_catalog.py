@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.artist_catalog import (
+    CATALOG_APPLE_LIMIT,
+    CATALOG_MAX_AGE,
+    CATALOG_SPOTIFY_LIMIT,
+    normalize_artist_text,
+    refresh_artist_catalog,
+    stale_catalog_artists,
+)
+from api.models import CatalogArtist, Song
+from api.rate_limit import LANE_BATCH
+from api.spotify import SpotifyClient
+
+
+class Command(BaseCommand):
+    help = 'Fill the local artist catalog index used by rerolls. Only artists older than --max-age-hours are fetched.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('artists', nargs='*', help='Artist names to index (default: refresh already indexed artists)')
+        parser.add_argument('--from-songs', action='store_true', help='Also index the primary artist of every Song')
+        parser.add_argument('--max-age-hours', type=float, default=CATALOG_MAX_AGE.total_seconds() / 3600)
+        parser.add_argument('--force', action='store_true', help='Refetch even if the artist is fresh')
+        parser.add_argument('--no-spotify', action='store_true', help='Only index Apple catalog positions')
+        parser.add_argument('--apple-limit', type=int, default=CATALOG_APPLE_LIMIT)
+        parser.add_argument('--spotify-limit', type=int, default=CATALOG_SPOTIFY_LIMIT)
+
+    def handle(self, *args, **options):
+        names: dict[str, str] = {}
+        for name in options['artists']:
+            names.setdefault(normalize_artist_text(name), name.strip())
+        if options['from_songs']:
+            for artist in Song.objects.values_list('artist', flat=True).distinct():
+                primary = (artist or '').split(',')[0].strip()
+                names.setdefault(normalize_artist_text(primary), primary)
+        names.pop('', None)
+
+        if not names:
+            names = {artist.key: artist.name for artist in CatalogArtist.objects.all()}
+
+        if not options['force']:
+            max_age = timedelta(hours=options['max_age_hours'])
+            fresh_keys = set(names) - set(stale_catalog_artists(max_age).values_list('key', flat=True))
+            fresh_keys &= set(CatalogArtist.objects.filter(key__in=names).values_list('key', flat=True))
+            for key in fresh_keys:
+                names.pop(key)
+
+        spotify_client = None if options['no_spotify'] else SpotifyClient(lane=LANE_BATCH)
+        if spotify_client is not None and not spotify_client.is_configured:
+            self.stdout.write(self.style.WARNING('Spotify is not configured; indexing Apple catalog only'))
+            spotify_client = None
+
+        indexed = 0
+        for key, name in sorted(names.items()):
+            artist = refresh_artist_catalog(
+                name,
+                spotify_client=spotify_client,
+                apple_limit=options['apple_limit'],
+                spotify_limit=options['spotify_limit'],
+            )
+            if artist is None:
+                continue
+            indexed += 1
+            self.stdout.write(f"Indexed {artist.name}: {artist.track_count} track(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Artist catalog updated; {indexed} artist(s) refreshed"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from api.ledger import MATERIALIZE_BATCH_SIZE, materialize_balances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Profile wallet/xp/level snapshots from the coin/XP ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild these users (default: everyone)')
+        parser.add_argument('--batch-size', type=int, default=MATERIALIZE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        usernames = options['usernames']
+        user_ids = None
+        if usernames:
+            User = get_user_model()
+            user_ids = list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+            missing = set(usernames) - set(User.objects.filter(id__in=user_ids).values_list('username', flat=True))
+            for username in sorted(missing):
+                self.stdout.write(self.style.WARNING(f"User '{username}' not found"))
+
+        changed = materialize_balances(user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt balances; {changed} profile(s) changed"))
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.hydration import record_track_hits
+from api.models import Song
+from api.rate_limit import LANE_BATCH
+from api.spotify import SpotifyClient
+
+
+class Command(BaseCommand):
+    help = 'Ask Spotify again about songs flagged as unresolvable and clear the flag on the ones that came back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=float, default=24, help='Only recheck songs flagged at least this long ago')
+        parser.add_argument('--limit', type=int, default=500)
+
+    def handle(self, *args, **options):
+        client = SpotifyClient(lane=LANE_BATCH)
+        if not client.is_configured:
+            self.stdout.write(self.style.ERROR('Spotify is not configured'))
+            return
+
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        track_ids = list(
+            Song.objects
+            .filter(spotify_unresolvable_at__lte=cutoff)
+            .exclude(spotify_track_id__isnull=True)
+            .order_by('spotify_unresolvable_at')
+            .values_list('spotify_track_id', flat=True)
+            .distinct()[:options['limit']]
+        )
+        if not track_ids:
+            self.stdout.write('No unresolvable songs due for a recheck')
+            return
+
+        fetched = client.get_tracks(track_ids)
+        for failure in client.last_failed_chunks:
+            reason = f"Spotify returned {failure.error_code}" if failure.error_code else "request failed"
+            self.stdout.write(self.style.WARNING(f"Chunk {failure.index} ({len(failure.ids)} track(s)) not checked: {reason}"))
+
+        record_track_hits(list(fetched))
+        still_missing = list(client.last_missing_track_ids)
+        # Push the flag forward so the next run starts with songs that were not just checked.
+        Song.objects.filter(spotify_track_id__in=still_missing).update(spotify_unresolvable_at=timezone.now())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rechecked {len(track_ids)} track(s): {len(fetched)} resolved, {len(still_missing)} still missing"
+        ))
@@ -0,0 +1,230 @@
+import os
+import re
+from typing import Callable, Hashable, Iterable
+
+from .local_lru import LocalLRU
+
+# Compiled reroll catalogs kept per process, so repeat rerolls over the same list skip the normalization.
+MATCH_INDEX_CACHE_ENTRIES = int(os.environ.get("MATCH_INDEX_CACHE_ENTRIES", "256"))
+MATCH_INDEX_CACHE_TTL_SECONDS = int(os.environ.get("MATCH_INDEX_CACHE_TTL_SECONDS", "600"))
+
+_WORD_SPLIT = re.compile(r"\W+")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+_COMPILED = LocalLRU(MATCH_INDEX_CACHE_ENTRIES, MATCH_INDEX_CACHE_TTL_SECONDS)
+
+
+def normalize_artist_text(value: str | None) -> str:
+    return _NON_ALNUM.sub("", (value or "").lower())
+
+
+def _word_tokens(text: str) -> set[str]:
+    return {token for token in _WORD_SPLIT.split(text) if token}
+
+
+class CandidateIndex:
+    """
+    A reroll catalog normalized once: casefolded titles and artists, title token-id sets and
+    the first position of every exact title and (title, artist) pair. Only worth building for
+    lists that are matched repeatedly; one-off lists are scored directly by the functions below.
+    """
+
+    __slots__ = (
+        "titles",
+        "artists",
+        "title_token_ids",
+        "vocabulary",
+        "first_title",
+        "first_pair",
+    )
+
+    def __init__(self, titles: list[str], artists: list[str]) -> None:
+        self.titles = tuple(titles)
+        self.artists = tuple(artists)
+        # Built on first use: only the catalog matcher scores shared words, and only when no exact entry hits.
+        self.vocabulary: dict[str, int] | None = None
+        self.title_token_ids: tuple[frozenset[int], ...] = ()
+        self.first_title: dict[str, int] = {}
+        self.first_pair: dict[tuple[str, str], int] = {}
+        for index, (title, artist) in enumerate(zip(self.titles, self.artists)):
+            self.first_title.setdefault(title, index)
+            self.first_pair.setdefault((title, artist), index)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def tokenized(self) -> tuple[dict[str, int], tuple[frozenset[int], ...]]:
+        """(token -> id, token-id set per title). Safe to race: every thread builds the same thing."""
+        if self.vocabulary is None:
+            vocabulary: dict[str, int] = {}
+            token_ids = tuple(
+                frozenset(vocabulary.setdefault(token, len(vocabulary)) for token in _word_tokens(title))
+                for title in self.titles
+            )
+            self.title_token_ids = token_ids
+            self.vocabulary = vocabulary
+        return self.vocabulary, self.title_token_ids
+
+
+def compile_tracks(tracks: Iterable) -> CandidateIndex:
+    """Index track-like objects (anything with .title and .artist) for catalog matching."""
+    items = list(tracks)
+    return CandidateIndex(
+        [(getattr(track, "title", None) or "").strip().casefold() for track in items],
+        [(getattr(track, "artist", None) or "").strip().casefold() for track in items],
+    )
+
+
+def cached_index(key: Hashable, build: Callable[[], CandidateIndex]) -> CandidateIndex:
+    index = _COMPILED.get(key)
+    if index is None:
+        index = build()
+        if len(index):
+            _COMPILED.set(key, index)
+    return index
+
+
+def compiled_tracks(tracks: list) -> CandidateIndex:
+    """compile_tracks, reusing the index built for an identical list earlier in this process."""
+    key = ("tracks", tuple((getattr(track, "title", None), getattr(track, "artist", None)) for track in tracks))
+    return cached_index(key, lambda: compile_tracks(tracks))
+
+
+def best_catalog_match(index: CandidateIndex, title: str | None, artist: str | None) -> int | None:
+    """
+    Position of the catalog track that best matches (title, artist), or None.
+    Title: exact 6, containment either way 4, two or more shared words 2; a title match is required.
+    Artist on top: exact +4, containment either way +2. Ties go to the earlier position.
+    """
+    wanted_title = (title or "").strip().casefold()
+    wanted_artist = (artist or "").strip().casefold()
+    if not wanted_title or not len(index):
+        return None
+
+    # The highest possible score goes to the first exact entry, so there is nothing to scan for.
+    if wanted_artist:
+        exact = index.first_pair.get((wanted_title, wanted_artist))
+    else:
+        exact = index.first_title.get(wanted_title)
+    if exact is not None:
+        return exact
+
+    vocabulary, title_token_ids = index.tokenized()
+    wanted_ids = {vocabulary[token] for token in _word_tokens(wanted_title) if token in vocabulary}
+    check_overlap = len(wanted_ids) >= 2
+
+    best_index = None
+    best_score = -1
+    for position, track_title in enumerate(index.titles):
+        if track_title == wanted_title:
+            score = 6
+        elif wanted_title in track_title or track_title in wanted_title:
+            score = 4
+        elif check_overlap and len(wanted_ids & title_token_ids[position]) >= 2:
+            score = 2
+        else:
+            continue
+
+        if wanted_artist:
+            track_artist = index.artists[position]
+            if track_artist == wanted_artist:
+                score += 4
+            elif wanted_artist in track_artist or track_artist in wanted_artist:
+                score += 2
+
+        if score > best_score:
+            best_score = score
+            best_index = position
+
+    return best_index if best_score > 0 else None
+
+
+def best_genre_match(results: list[dict], wanted_title: str, artist_tokens: list[str]) -> str | None:
+    """
+    primaryGenreName of the best iTunes result. Title: exact +5, contained +2. Every artist token:
+    exact +4, contained +2, and at least one must match when any are given.
+    wanted_title and artist_tokens are expected casefolded.
+    """
+    best_genre = None
+    best_score = -1
+    max_score = 5 + 4 * len(artist_tokens)
+    for item in results:
+        genre_name = (item.get("primaryGenreName") or "").strip()
+        if not genre_name:
+            continue
+
+        score = 0
+        track_name = str(item.get("trackName", "")).casefold()
+        if track_name == wanted_title:
+            score += 5
+        elif wanted_title and wanted_title in track_name:
+            score += 2
+
+        if artist_tokens:
+            artist_name = str(item.get("artistName", "")).casefold()
+            matched_artist = False
+            for token in artist_tokens:
+                if artist_name == token:
+                    score += 4
+                    matched_artist = True
+                elif token in artist_name:
+                    score += 2
+                    matched_artist = True
+            if not matched_artist:
+                continue
+
+        if score > best_score:
+            best_score = score
+            best_genre = genre_name
+            if score == max_score:
+                break
+
+    return best_genre
+
+
+def best_preview_match(results: list[dict], wanted_title: str, wanted_artist: str) -> str | None:
+    """
+    previewUrl of the best iTunes result. Title: exact +4, contained +2; artist, when given,
+    the same. wanted_title and wanted_artist are expected casefolded.
+    """
+    best_preview_url = None
+    best_score = -1
+    max_score = 8 if wanted_artist else 4
+    for item in results:
+        preview_url = item.get("previewUrl")
+        if not preview_url:
+            continue
+
+        score = 0
+        track_name = str(item.get("trackName", "")).casefold()
+        if track_name == wanted_title:
+            score += 4
+        elif wanted_title and wanted_title in track_name:
+            score += 2
+
+        if wanted_artist:
+            artist_name = str(item.get("artistName", "")).casefold()
+            if artist_name == wanted_artist:
+                score += 4
+            elif wanted_artist in artist_name:
+                score += 2
+
+        if score > best_score:
+            best_score = score
+            best_preview_url = preview_url
+            if score == max_score:
+                break
+
+    return best_preview_url
+
+
+def artist_key_positions(tracks: list, artist_keyword: str) -> list[int]:
+    """Positions of the tracks whose normalized artist contains the normalized keyword."""
+    key = normalize_artist_text(artist_keyword)
+    if not key:
+        return []
+    return [
+        position
+        for position, track in enumerate(tracks)
+        if key in normalize_artist_text(getattr(track, "artist", None))
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_profile_level_profile_xp"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sleeve",
+            name="contents_version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+XP_PER_LEVEL_STEP = 500
+
+
+def seed_opening_balances(apps, schema_editor):
+    Profile = apps.get_model("api", "Profile")
+    LedgerEntry = apps.get_model("api", "LedgerEntry")
+
+    entries = []
+    for user_id, wallet, level, xp in Profile.objects.values_list("user_id", "wallet", "level", "xp"):
+        completed_levels = max(1, level or 1) - 1
+        total_xp = XP_PER_LEVEL_STEP * completed_levels * (completed_levels + 1) // 2 + max(0, xp or 0)
+        entries.append(
+            LedgerEntry(
+                user_id=user_id,
+                reason="opening_balance",
+                wallet_delta=wallet or 0,
+                xp_delta=total_xp,
+            )
+        )
+    LedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0012_sleeve_contents_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('opening_balance', 'opening_balance'), ('sleeve_open', 'sleeve_open'), ('market_purchase', 'market_purchase'), ('market_sale', 'market_sale'), ('daily_bonus', 'daily_bonus'), ('test_gold', 'test_gold'), ('adjustment', 'adjustment')], max_length=40)),
+                ('wallet_delta', models.IntegerField(default=0)),
+                ('xp_delta', models.IntegerField(default=0)),
+                ('reference', models.CharField(blank=True, default='', max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='api_ledgere_user_id_91fbf5_idx'), models.Index(fields=['reason', '-created_at'], name='api_ledgere_reason_d6397e_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
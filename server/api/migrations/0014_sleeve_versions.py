@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def publish_existing_contents(apps, schema_editor):
+    Sleeve = apps.get_model("api", "Sleeve")
+    SleeveVersion = apps.get_model("api", "SleeveVersion")
+    SleeveSong = apps.get_model("api", "SleeveSong")
+
+    now = timezone.now()
+    for sleeve in Sleeve.objects.all():
+        version = SleeveVersion.objects.create(sleeve=sleeve, number=1, published_at=now)
+        SleeveSong.objects.filter(sleeve=sleeve).update(version=version)
+        sleeve.active_version = version
+        sleeve.save(update_fields=["active_version"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_ledgerentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SleeveVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('sleeve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='api.sleeve')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sleeve',
+            name='active_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.sleeveversion'),
+        ),
+        migrations.AddField(
+            model_name='sleevesong',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='api.sleeveversion'),
+        ),
+        migrations.AddConstraint(
+            model_name='sleeveversion',
+            constraint=models.UniqueConstraint(fields=('sleeve', 'number'), name='unique_sleeve_version_number'),
+        ),
+        migrations.RunPython(publish_existing_contents, migrations.RunPython.noop),
+    ]
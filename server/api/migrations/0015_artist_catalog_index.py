@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_sleeve_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogArtist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('name', models.CharField(max_length=500)),
+                ('spotify_artist_id', models.CharField(blank=True, db_index=True, max_length=200, null=True)),
+                ('track_count', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArtistCatalogTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('apple', 'apple'), ('spotify', 'spotify')], max_length=20)),
+                ('position', models.PositiveIntegerField()),
+                ('provider_track_id', models.CharField(max_length=200)),
+                ('title', models.CharField(max_length=500)),
+                ('artist_name', models.CharField(max_length=500)),
+                ('cover_url', models.CharField(blank=True, max_length=1000, null=True)),
+                ('genre', models.CharField(blank=True, max_length=200, null=True)),
+                ('url', models.CharField(blank=True, max_length=1000, null=True)),
+                ('artist_ids', models.CharField(blank=True, default='', max_length=1000)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracks', to='api.catalogartist')),
+            ],
+            options={
+                'ordering': ['artist', 'provider', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='artistcatalogtrack',
+            constraint=models.UniqueConstraint(fields=('artist', 'provider', 'position'), name='unique_artist_catalog_position'),
+        ),
+    ]
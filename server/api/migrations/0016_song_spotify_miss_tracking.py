@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_artist_catalog_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='spotify_miss_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='spotify_unresolvable_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='song',
+            name='spotify_track_id',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+    ]
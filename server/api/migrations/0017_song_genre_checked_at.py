@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_song_spotify_miss_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='genre_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
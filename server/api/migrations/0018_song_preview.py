@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_song_genre_checked_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongPreview',
+            fields=[
+                ('song', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='preview', serialize=False, to='api.song')),
+                ('preview_url', models.CharField(blank=True, max_length=1000, null=True)),
+                ('source', models.CharField(default='itunes', max_length=20)),
+                ('resolved_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_song_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SleeveRefreshRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genres', models.JSONField(default=list)),
+                ('limit', models.PositiveIntegerField()),
+                ('market', models.CharField(max_length=10)),
+                ('local_only', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('running', 'running'), ('completed', 'completed'), ('failed', 'failed')], default='running', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SleeveRefreshCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.CharField(max_length=100)),
+                ('stage', models.CharField(choices=[('fetch', 'fetch'), ('score', 'score'), ('publish', 'publish')], max_length=20)),
+                ('candidates', models.JSONField(blank=True, null=True)),
+                ('chosen', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='api.sleeverefreshrun')),
+                ('version', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.sleeveversion')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sleeverefreshcheckpoint',
+            constraint=models.UniqueConstraint(fields=('run', 'genre'), name='unique_refresh_checkpoint_genre'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Song(models.Model):
@@ -8,8 +9,13 @@ class Song(models.Model):
     artist = models.CharField(max_length=500)
     cover_url = models.CharField(max_length=1000, blank=True, null=True)
     genre = models.CharField(max_length=200, blank=True, null=True)
-    spotify_track_id = models.CharField(max_length=200, blank=True, null=True)
+    spotify_track_id = models.CharField(max_length=200, blank=True, null=True, db_index=True)
     spotify_url = models.CharField(max_length=1000, blank=True, null=True)
+    # Consecutive hydrations where Spotify returned nothing for spotify_track_id.
+    spotify_miss_count = models.PositiveIntegerField(default=0)
+    spotify_unresolvable_at = models.DateTimeField(blank=True, null=True)
+    # Last time genre enrichment looked this song up, whether or not it found a genre.
+    genre_checked_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.title} - {self.artist}"
@@ -21,10 +27,48 @@ class Sleeve(models.Model):
     genre = models.CharField(max_length=100)
     cost = models.IntegerField(default=0)
     refreshed_weekly = models.BooleanField(default=False)
+    contents_version = models.PositiveIntegerField(default=1)
+    active_version = models.ForeignKey(
+        'SleeveVersion',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
 
     def __str__(self):
         return self.name
 
+    def ensure_active_version(self) -> 'SleeveVersion':
+        """Return the published contents version, publishing an empty first version if there is none."""
+        if self.active_version_id is not None:
+            return self.active_version
+
+        version, _ = SleeveVersion.objects.get_or_create(
+            sleeve=self,
+            number=1,
+            defaults={'published_at': timezone.now()},
+        )
+        Sleeve.objects.filter(pk=self.pk, active_version__isnull=True).update(active_version=version)
+        self.refresh_from_db(fields=['active_version'])
+        return self.active_version
+
+
+class SleeveVersion(models.Model):
+    """One complete set of sleeve contents. Sleeve.active_version points at the published one."""
+    sleeve = models.ForeignKey(Sleeve, related_name='versions', on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sleeve', 'number'], name='unique_sleeve_version_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.sleeve_id} v{self.number}"
+
 
 RARITY_CHOICES = [
     ("Common", "Common"),
@@ -40,10 +84,23 @@ class SleeveSong(models.Model):
     song = models.ForeignKey(Song, on_delete=models.CASCADE)
     rarity = models.CharField(max_length=50, choices=RARITY_CHOICES)
     weight = models.FloatField(blank=True, null=True)
+    version = models.ForeignKey(
+        SleeveVersion,
+        related_name='entries',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
 
     def __str__(self):
         return f"{self.song} in {self.sleeve} ({self.rarity})"
 
+    def save(self, *args, **kwargs):
+        # Rows added one at a time (admin, seed scripts) join the published version.
+        if self.version_id is None:
+            self.version = self.sleeve.ensure_active_version()
+        super().save(*args, **kwargs)
+
 
 class Profile(models.Model):
     """Simple profile attached to Django User to store display name, wallet, and avatar."""
@@ -138,11 +195,145 @@ class MarketListing(models.Model):
         return f"{self.owned_song_id} listed by {self.seller_id} ({self.status})"
 
 
+LEDGER_REASON_CHOICES = [
+    ("opening_balance", "opening_balance"),
+    ("sleeve_open", "sleeve_open"),
+    ("market_purchase", "market_purchase"),
+    ("market_sale", "market_sale"),
+    ("daily_bonus", "daily_bonus"),
+    ("test_gold", "test_gold"),
+    ("adjustment", "adjustment"),
+]
+
+
+class LedgerEntry(models.Model):
+    """Append-only record of wallet/XP changes; Profile.wallet/xp/level are a snapshot of these."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ledger_entries')
+    reason = models.CharField(max_length=40, choices=LEDGER_REASON_CHOICES)
+    wallet_delta = models.IntegerField(default=0)
+    xp_delta = models.IntegerField(default=0)
+    reference = models.CharField(max_length=200, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['reason', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.reason} for {self.user_id}: wallet {self.wallet_delta:+d}, xp {self.xp_delta:+d}"
+
+
+CATALOG_PROVIDER_CHOICES = [
+    ("apple", "apple"),
+    ("spotify", "spotify"),
+]
+
+
+class CatalogArtist(models.Model):
+    """An artist whose track catalog has been pulled into the local index for rerolls."""
+    key = models.CharField(max_length=200, unique=True)
+    name = models.CharField(max_length=500)
+    spotify_artist_id = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    track_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ArtistCatalogTrack(models.Model):
+    artist = models.ForeignKey(CatalogArtist, related_name='tracks', on_delete=models.CASCADE)
+    provider = models.CharField(max_length=20, choices=CATALOG_PROVIDER_CHOICES)
+    position = models.PositiveIntegerField()
+    provider_track_id = models.CharField(max_length=200)
+    title = models.CharField(max_length=500)
+    artist_name = models.CharField(max_length=500)
+    cover_url = models.CharField(max_length=1000, blank=True, null=True)
+    genre = models.CharField(max_length=200, blank=True, null=True)
+    url = models.CharField(max_length=1000, blank=True, null=True)
+    artist_ids = models.CharField(max_length=1000, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['artist', 'provider', 'position'],
+                name='unique_artist_catalog_position',
+            ),
+        ]
+        ordering = ['artist', 'provider', 'position']
+
+    def __str__(self):
+        return f"{self.artist_id} {self.provider} #{self.position}: {self.title}"
+
+
+class SongPreview(models.Model):
+    """Resolved preview clip per song. A null preview_url records that the lookup found nothing."""
+    song = models.OneToOneField(Song, primary_key=True, related_name='preview', on_delete=models.CASCADE)
+    preview_url = models.CharField(max_length=1000, blank=True, null=True)
+    source = models.CharField(max_length=20, default='itunes')
+    resolved_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.song_id}: {self.preview_url or 'no preview'}"
+
+
+REFRESH_RUN_STATUS_CHOICES = [
+    ("running", "running"),
+    ("completed", "completed"),
+    ("failed", "failed"),
+]
+
+# In order; a checkpoint's stage is the last one that genre completed.
+REFRESH_STAGE_CHOICES = [
+    ("fetch", "fetch"),
+    ("score", "score"),
+    ("publish", "publish"),
+]
+
+
+class SleeveRefreshRun(models.Model):
+    """One weekly sleeve refresh, kept so an interrupted run can be resumed with the same options."""
+    genres = models.JSONField(default=list)
+    limit = models.PositiveIntegerField()
+    market = models.CharField(max_length=10)
+    local_only = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=REFRESH_RUN_STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"refresh run {self.pk} ({self.status})"
+
+
+class SleeveRefreshCheckpoint(models.Model):
+    """How far one genre of a refresh run got, with the data needed to carry on from there."""
+    run = models.ForeignKey(SleeveRefreshRun, related_name='checkpoints', on_delete=models.CASCADE)
+    genre = models.CharField(max_length=100)
+    stage = models.CharField(max_length=20, choices=REFRESH_STAGE_CHOICES)
+    candidates = models.JSONField(blank=True, null=True)
+    chosen = models.JSONField(blank=True, null=True)
+    version = models.ForeignKey(SleeveVersion, related_name='+', on_delete=models.SET_NULL, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'genre'], name='unique_refresh_checkpoint_genre'),
+        ]
+
+    def __str__(self):
+        return f"run {self.run_id} {self.genre}: {self.stage}"
+
+
 # Ensure a Profile exists for each User
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
+from .leveling import total_xp_for
+
 
 @receiver(post_save, sender=get_user_model())
 def create_or_update_profile(sender, instance, created, **kwargs):
@@ -153,4 +344,23 @@ def create_or_update_profile(sender, instance, created, **kwargs):
         try:
             instance.profile
         except Profile.DoesNotExist:
-            Profile.objects.create(user=instance, display_name=instance.username)
\ No newline at end of file
+            Profile.objects.create(user=instance, display_name=instance.username)
+
+
+@receiver(post_save, sender=Profile)
+def record_opening_balance(sender, instance, created, **kwargs):
+    if created:
+        LedgerEntry.objects.create(
+            user_id=instance.user_id,
+            reason='opening_balance',
+            wallet_delta=instance.wallet or 0,
+            xp_delta=total_xp_for(instance.level, instance.xp),
+        )
+
+
+@receiver(post_save, sender=SleeveSong)
+@receiver(post_delete, sender=SleeveSong)
+def bump_sleeve_contents_version(sender, instance, **kwargs):
+    # Anything cached per sleeve (e.g. the opening alias table) is keyed by this counter.
+    # The sleeves payload version is derived from these rows too, so it rolls over with them.
+    Sleeve.objects.filter(pk=instance.sleeve_id).update(contents_version=F('contents_version') + 1)
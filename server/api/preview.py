@@ -1,10 +1,31 @@
+import hashlib
 import json
+import os
 import re
 from dataclasses import dataclass
 from urllib import error, parse, request
 
+from django.core.cache import cache
 
-ITUNES_SEARCH_URL = "https://itunes.apple.com/search"
+from . import circuit_breaker, http_transport, rate_limit
+from .matching import best_genre_match, best_preview_match
+from .single_flight import single_flight, single_flight_key
+
+
+ITUNES_SEARCH_URL = os.environ.get("ITUNES_SEARCH_URL", "https://itunes.apple.com/search")
+ITUNES_HTTP_TIMEOUT_SECONDS = float(os.environ.get("ITUNES_HTTP_TIMEOUT_SECONDS", "15"))
+ITUNES_SEARCH_CACHE_TTL_SECONDS = int(os.environ.get("ITUNES_SEARCH_CACHE_TTL_SECONDS", "21600"))
+ITUNES_SEARCH_NEGATIVE_TTL_SECONDS = int(os.environ.get("ITUNES_SEARCH_NEGATIVE_TTL_SECONDS", "600"))
+# The only result fields any helper reads; everything else is dropped before caching.
+ITUNES_RESULT_FIELDS = (
+    "trackId",
+    "trackName",
+    "artistName",
+    "primaryGenreName",
+    "artworkUrl100",
+    "previewUrl",
+    "trackViewUrl",
+)
 
 
 @dataclass
@@ -36,23 +57,86 @@ def _itunes_high_res_artwork(url: str | None, *, size: int = 1000) -> str | None
 
 
 
-def _itunes_song_candidates(query_text: str, *, limit: int = 10) -> list[dict]:
-    params = parse.urlencode(
+def _itunes_search_request(params: dict, *, timeout: float, lane: str) -> dict:
+    """
+    One iTunes Search call behind the shared rate limit and circuit breaker.
+    Raises URLError without touching the network when either of them refuses the call.
+    """
+    if not circuit_breaker.allow_request(*circuit_breaker.ITUNES_SEARCH):
+        raise error.URLError("itunes search circuit open")
+    if rate_limit.acquire("itunes", "search", lane) > 0:
+        circuit_breaker.release_probe(*circuit_breaker.ITUNES_SEARCH)
+        raise error.URLError("itunes search budget exhausted")
+
+    req = request.Request(f"{ITUNES_SEARCH_URL}?{parse.urlencode(params)}", method="GET")
+    try:
+        with http_transport.urlopen(req, timeout=timeout) as resp:
+            raw = resp.read()
+    except error.HTTPError as exc:
+        if circuit_breaker.is_failure_status(exc.code):
+            circuit_breaker.record_failure(*circuit_breaker.ITUNES_SEARCH)
+        else:
+            circuit_breaker.release_probe(*circuit_breaker.ITUNES_SEARCH)
+        raise
+    except (error.URLError, TimeoutError):
+        circuit_breaker.record_failure(*circuit_breaker.ITUNES_SEARCH)
+        raise
+    circuit_breaker.record_success(*circuit_breaker.ITUNES_SEARCH)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _itunes_cache_key(params: dict) -> str:
+    normalized = sorted((key, " ".join(str(value).split()).casefold()) for key, value in params.items())
+    digest = hashlib.sha1(json.dumps(normalized).encode("utf-8")).hexdigest()
+    return f"itunes:search:{digest}"
+
+
+def _compact_results(payload: dict) -> list[dict]:
+    return [
+        {field: item[field] for field in ITUNES_RESULT_FIELDS if item.get(field) is not None}
+        for item in payload.get("results", [])
+        if isinstance(item, dict)
+    ]
+
+
+def _itunes_search(
+    params: dict,
+    *,
+    timeout: float = ITUNES_HTTP_TIMEOUT_SECONDS,
+    lane: str = rate_limit.LANE_INTERACTIVE,
+) -> list[dict]:
+    """
+    Compacted iTunes Search results, shared by the genre, preview and artist lookups.
+    Keyed by the normalized query parameters; empty answers are cached briefly, errors not at all.
+    Concurrent misses for the same query share one request.
+    """
+    key = _itunes_cache_key(params)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    def fetch() -> list[dict]:
+        results = _compact_results(_itunes_search_request(params, timeout=timeout, lane=lane))
+        ttl = ITUNES_SEARCH_CACHE_TTL_SECONDS if results else ITUNES_SEARCH_NEGATIVE_TTL_SECONDS
+        cache.set(key, results, timeout=ttl)
+        return results
+
+    return single_flight(single_flight_key("itunes-search", key), fetch)
+
+
+def _itunes_song_candidates(query_text: str, *, limit: int = 10, lane: str = rate_limit.LANE_INTERACTIVE) -> list[dict]:
+    return _itunes_search(
         {
             "term": query_text,
             "media": "music",
             "entity": "song",
             "limit": limit,
             "country": "US",
-        }
+        },
+        lane=lane,
     )
-    req = request.Request(f"{ITUNES_SEARCH_URL}?{params}", method="GET")
-    with request.urlopen(req, timeout=15) as resp:
-        payload = json.loads(resp.read().decode("utf-8"))
-    return payload.get("results", [])
-
 
-def search_track_genre(title: str, artist: str | None = None) -> str | None:
+def search_track_genre(title: str, artist: str | None = None, *, lane: str = rate_limit.LANE_INTERACTIVE) -> str | None:
     """Find the most likely Apple/iTunes genre label for a track."""
     normalized_title = (title or "").strip()
     normalized_artist = (artist or "").strip()
@@ -76,45 +160,10 @@ def search_track_genre(title: str, artist: str | None = None) -> str | None:
         seen_queries.add(key)
 
         try:
-            candidates = _itunes_song_candidates(query_text, limit=20)
+            candidates = _itunes_song_candidates(query_text, limit=20, lane=lane)
         except (error.HTTPError, error.URLError, TimeoutError, ValueError):
             continue
-        if not candidates:
-            continue
-
-        best_score = -1
-        best_genre: str | None = None
-
-        for item in candidates:
-            genre_name = (item.get("primaryGenreName") or "").strip()
-            if not genre_name:
-                continue
-
-            score = 0
-            track_name = str(item.get("trackName", "")).casefold()
-            artist_name = str(item.get("artistName", "")).casefold()
-
-            if track_name == wanted_title:
-                score += 5
-            elif wanted_title and wanted_title in track_name:
-                score += 2
-
-            matched_artist = False
-            for token in artist_tokens:
-                if artist_name == token:
-                    score += 4
-                    matched_artist = True
-                elif token in artist_name:
-                    score += 2
-                    matched_artist = True
-
-            if artist_tokens and not matched_artist:
-                continue
-
-            if score > best_score:
-                best_score = score
-                best_genre = genre_name
-
+        best_genre = best_genre_match(candidates, wanted_title, artist_tokens)
         if best_genre:
             return best_genre
 
@@ -124,6 +173,22 @@ def search_track_genre(title: str, artist: str | None = None) -> str | None:
 
 def search_preview_snippet(title: str, artist: str | None = None) -> PreviewSnippet | None:
     """Find an external preview clip for a track using Apple's iTunes Search API."""
+    try:
+        return lookup_preview_snippet(title, artist)
+    except (error.HTTPError, error.URLError, TimeoutError, ValueError):
+        return None
+
+
+def lookup_preview_snippet(
+    title: str,
+    artist: str | None = None,
+    *,
+    lane: str = rate_limit.LANE_INTERACTIVE,
+) -> PreviewSnippet | None:
+    """
+    Like search_preview_snippet, but provider errors (including rate-limit and breaker refusals)
+    are raised, so callers can tell "iTunes has no preview" apart from "iTunes did not answer".
+    """
     normalized_title = (title or "").strip()
     normalized_artist = (artist or "").strip()
 
@@ -131,70 +196,52 @@ def search_preview_snippet(title: str, artist: str | None = None) -> PreviewSnip
         return None
 
     query_text = normalized_title if not normalized_artist else f"{normalized_title} {normalized_artist}"
-    params = parse.urlencode(
+    candidates = _itunes_search(
         {
             "term": query_text,
             "media": "music",
             "entity": "song",
             "limit": 10,
-        }
+        },
+        lane=lane,
     )
 
-    req = request.Request(f"{ITUNES_SEARCH_URL}?{params}", method="GET")
-    try:
-        with request.urlopen(req, timeout=15) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-    except (error.HTTPError, error.URLError, TimeoutError, ValueError):
-        return None
-
-    candidates = payload.get("results", [])
-    if not candidates:
-        return None
-
-    wanted_title = normalized_title.casefold()
-    wanted_artist = normalized_artist.casefold()
-
-    best_score = -1
-    best_preview_url: str | None = None
-
-    for item in candidates:
-        preview_url = item.get("previewUrl")
-        if not preview_url:
-            continue
-
-        score = 0
-        track_name = str(item.get("trackName", "")).casefold()
-        artist_name = str(item.get("artistName", "")).casefold()
-
-        if track_name == wanted_title:
-            score += 4
-        elif wanted_title and wanted_title in track_name:
-            score += 2
-
-        if wanted_artist and artist_name == wanted_artist:
-            score += 4
-        elif wanted_artist and wanted_artist in artist_name:
-            score += 2
-
-        if score > best_score:
-            best_score = score
-            best_preview_url = preview_url
-
+    best_preview_url = best_preview_match(candidates, normalized_title.casefold(), normalized_artist.casefold())
     if not best_preview_url:
         return None
 
     return PreviewSnippet(preview_url=best_preview_url)
 
 
-    return PreviewSnippet(preview_url=best_preview_url)
+def search_artist_song_candidates(
+    artist_keyword: str,
+    *,
+    limit: int = 75,
+    timeout: float = ITUNES_HTTP_TIMEOUT_SECONDS,
+    lane: str = rate_limit.LANE_INTERACTIVE,
+) -> list[AppleTrackData]:
+    try:
+        return lookup_artist_song_candidates(artist_keyword, limit=limit, timeout=timeout, lane=lane)
+    except (error.HTTPError, error.URLError, TimeoutError, ValueError):
+        return []
 
 
-def search_artist_song_candidates(artist_keyword: str, *, limit: int = 75) -> list[AppleTrackData]:
+def lookup_artist_song_candidates(
+    artist_keyword: str,
+    *,
+    limit: int = 75,
+    timeout: float = ITUNES_HTTP_TIMEOUT_SECONDS,
+    lane: str = rate_limit.LANE_INTERACTIVE,
+) -> list[AppleTrackData]:
+    """
+    Like search_artist_song_candidates, but provider errors (including rate-limit and breaker
+    refusals) are raised, so an empty list always means iTunes answered with no tracks.
+    """
     cleaned_keyword = (artist_keyword or "").strip()
     if not cleaned_keyword:
         return []
 
-    params = parse.urlencode(
+    results = _itunes_search(
         {
             "term": cleaned_keyword,
             "media": "music",
@@ -202,14 +249,10 @@ def search_artist_song_candidates(artist_keyword: str, *, limit: int = 75) -> li
             "attribute": "artistTerm",
             "country": "US",
             "limit": max(1, min(limit, 200)),
-        }
+        },
+        timeout=timeout,
+        lane=lane,
     )
-    req = request.Request(f"{ITUNES_SEARCH_URL}?{params}", method="GET")
-    try:
-        with request.urlopen(req, timeout=15) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-    except (error.HTTPError, error.URLError, TimeoutError, ValueError):
-        return []
 
     keyword_tokens = [token.casefold() for token in _artist_tokens(cleaned_keyword)]
     if not keyword_tokens:
@@ -217,7 +260,7 @@ def search_artist_song_candidates(artist_keyword: str, *, limit: int = 75) -> li
 
     parsed: list[AppleTrackData] = []
     seen_track_ids: set[str] = set()
-    for item in payload.get("results", []):
+    for item in results:
         tid = item.get("trackId")
         title = (item.get("trackName") or "").strip()
         artist = (item.get("artistName") or "").strip()
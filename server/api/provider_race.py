@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+REROLL_LOOKUP_DEADLINE_SECONDS = float(os.environ.get("REROLL_LOOKUP_DEADLINE_SECONDS", "8"))
+
+# Loaders receive the absolute monotonic deadline and a cancel event, and should stop
+# between provider calls once either trips.
+SourceLoader = Callable[[float, threading.Event], list[Any]]
+
+
+
+@dataclass
+class RaceResult:
+    apple: list[Any] = field(default_factory=list)
+    spotify: list[Any] = field(default_factory=list)
+    failed: set[str] = field(default_factory=set)
+    timed_out: bool = False
+
+
+def remaining_timeout(deadline: float | None, default: float) -> float:
+    if deadline is None:
+        return default
+    return min(default, deadline - time.monotonic())
+
+
+def _start_lookup(loader: SourceLoader, deadline: float, cancelled: threading.Event) -> Future:
+    """
+    Run one loader on its own thread. A shared pool would make lookups queue behind cancelled
+    losers that are still inside a provider call, spending their deadline before they start.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(loader(deadline, cancelled))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name="reroll-lookup", daemon=True).start()
+    return future
+
+
+def race_candidate_sources(
+    apple_loader: SourceLoader | None,
+    spotify_loader: SourceLoader | None,
+    *,
+    deadline_seconds: float = REROLL_LOOKUP_DEADLINE_SECONDS,
+) -> RaceResult:
+    """
+    Run the Apple and Spotify lookups side by side under one deadline.
+    Apple candidates win as soon as they arrive because their ranking drives rarity;
+    Spotify wins once Apple has come back empty, or when the deadline hits first.
+    Whatever is still running at that point is told to stop and its result is dropped.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    cancelled = threading.Event()
+    sources: dict[Future, str] = {}
+    if apple_loader is not None:
+        sources[_start_lookup(apple_loader, deadline, cancelled)] = "apple"
+    if spotify_loader is not None:
+        sources[_start_lookup(spotify_loader, deadline, cancelled)] = "spotify"
+
+    result = RaceResult()
+    pending = set(sources)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result.timed_out = True
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = sources[future]
+                try:
+                    candidates = future.result() or []
+                except Exception:
+                    result.failed.add(source)
+                    continue
+                setattr(result, source, list(candidates))
+
+            if result.apple:
+                break
+            apple_pending = any(sources[future] == "apple" for future in pending)
+            if result.spotify and not apple_pending:
+                break
+    finally:
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+
+    if result.apple:
+        result.spotify = []
+    return result
@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+LANE_INTERACTIVE = "interactive"
+LANE_BATCH = "batch"
+
+# Batch callers (weekly refresh, catalog builds) may only use this share of the burst,
+# so a user-facing request always finds tokens left over.
+RATE_LIMIT_BATCH_SHARE = float(os.environ.get("RATE_LIMIT_BATCH_SHARE", "0.5"))
+RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS", "2"))
+RATE_LIMIT_BATCH_MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_BATCH_MAX_WAIT_SECONDS", "60"))
+_LOCK_TIMEOUT_SECONDS = 2
+_LOCK_SPIN_SECONDS = 0.002
+_LOCK_MAX_SPINS = 250
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate_per_second: float
+    burst: int
+
+
+RATE_LIMITS: dict[tuple[str, str], RateLimit] = {
+    ("spotify", "api"): RateLimit(
+        rate_per_second=float(os.environ.get("SPOTIFY_RATE_PER_SECOND", "4")),
+        burst=int(os.environ.get("SPOTIFY_RATE_BURST", "8")),
+    ),
+    ("spotify", "auth"): RateLimit(rate_per_second=0.5, burst=2),
+    ("itunes", "search"): RateLimit(
+        rate_per_second=float(os.environ.get("ITUNES_RATE_PER_SECOND", "1")),
+        burst=int(os.environ.get("ITUNES_RATE_BURST", "10")),
+    ),
+}
+
+
+def _bucket_key(provider: str, endpoint: str) -> str:
+    return f"ratelimit:{provider}:{endpoint}:tat"
+
+
+def _tolerance(limit: RateLimit, lane: str) -> float:
+    tolerance = (max(1, limit.burst) - 1) / limit.rate_per_second
+    if lane == LANE_BATCH:
+        tolerance *= RATE_LIMIT_BATCH_SHARE
+    return tolerance
+
+
+def _wait_for(tat: float, now: float, tolerance: float) -> float:
+    return max(0.0, max(tat, now) - now - tolerance)
+
+
+def wait_time(provider: str, endpoint: str, lane: str = LANE_INTERACTIVE) -> float:
+    """Seconds until a call in this lane would be allowed, without taking a token."""
+    limit = RATE_LIMITS.get((provider, endpoint))
+    if limit is None:
+        return 0.0
+    tat = cache.get(_bucket_key(provider, endpoint)) or 0.0
+    return _wait_for(tat, time.time(), _tolerance(limit, lane))
+
+
+def try_acquire(provider: str, endpoint: str, lane: str = LANE_INTERACTIVE) -> float:
+    """
+    Take one token if one is available and return 0, otherwise return the wait in seconds.
+    The bucket is stored as a GCRA theoretical arrival time in the shared cache, so every
+    worker and the refresh daemon draw from the same budget.
+    """
+    limit = RATE_LIMITS.get((provider, endpoint))
+    if limit is None:
+        return 0.0
+
+    key = _bucket_key(provider, endpoint)
+    lock_key = f"{key}:lock"
+    owner = uuid.uuid4().hex
+    locked = False
+    for _ in range(_LOCK_MAX_SPINS):
+        if cache.add(lock_key, owner, timeout=_LOCK_TIMEOUT_SECONDS):
+            locked = True
+            break
+        time.sleep(_LOCK_SPIN_SECONDS)
+
+    try:
+        now = time.time()
+        tat = max(cache.get(key) or 0.0, now)
+        wait = _wait_for(tat, now, _tolerance(limit, lane))
+        if wait > 0:
+            return wait
+        interval = 1.0 / limit.rate_per_second
+        new_tat = tat + interval
+        cache.set(key, new_tat, timeout=int(new_tat - now) + 60)
+        return 0.0
+    finally:
+        # If the lock could not be taken we fail open rather than stall provider calls.
+        if locked and cache.get(lock_key) == owner:
+            cache.delete(lock_key)
+
+
+def acquire(provider: str, endpoint: str, lane: str = LANE_INTERACTIVE, *, max_wait: float | None = None) -> float:
+    """
+    Block until a token is taken. Returns 0 on success, or the remaining wait in seconds
+    if getting a token would take longer than max_wait (the caller should back off).
+    """
+    if max_wait is None:
+        max_wait = RATE_LIMIT_BATCH_MAX_WAIT_SECONDS if lane == LANE_BATCH else RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = try_acquire(provider, endpoint, lane)
+        if wait <= 0:
+            return 0.0
+        remaining = deadline - time.monotonic()
+        if wait > remaining:
+            return wait
+        time.sleep(wait)
@@ -41,7 +41,7 @@ class SleeveSongSerializer(serializers.ModelSerializer):
 
 
 class SleeveSerializer(serializers.ModelSerializer):
-    contents = SleeveSongSerializer(many=True)
+    contents = SleeveSongSerializer(source='active_contents', many=True)
     refreshedWeekly = serializers.BooleanField(source='refreshed_weekly')
 
     class Meta:
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+from django.core.cache import cache
+
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.environ.get("SINGLE_FLIGHT_LEASE_SECONDS", "15"))
+SINGLE_FLIGHT_RESULT_SECONDS = int(os.environ.get("SINGLE_FLIGHT_RESULT_SECONDS", "5"))
+SINGLE_FLIGHT_POLL_SECONDS = 0.05
+
+T = TypeVar("T")
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+_IN_FLIGHT: dict[str, _Call] = {}
+_IN_FLIGHT_LOCK = threading.Lock()
+
+
+def single_flight_key(namespace: str, *parts: Any) -> str:
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"singleflight:{namespace}:{digest}"
+
+
+def _wait_for_other_process(key: str, lease_seconds: int) -> Any:
+    """Poll for the result another worker is producing; give up once its lease is gone or expires."""
+    deadline = time.monotonic() + lease_seconds
+    while time.monotonic() < deadline:
+        shared = cache.get(f"{key}:result", _MISSING)
+        if shared is not _MISSING:
+            return shared
+        if cache.get(f"{key}:lease") is None:
+            break
+        time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+    return cache.get(f"{key}:result", _MISSING)
+
+
+def _lead(key: str, fn: Callable[[], T], lease_seconds: int) -> T:
+    lease_key = f"{key}:lease"
+    if not cache.add(lease_key, True, timeout=lease_seconds):
+        shared = _wait_for_other_process(key, lease_seconds)
+        if shared is not _MISSING:
+            return shared
+        # The other worker died or took too long; do the call ourselves.
+    try:
+        result = fn()
+        cache.set(f"{key}:result", result, timeout=SINGLE_FLIGHT_RESULT_SECONDS)
+        return result
+    finally:
+        cache.delete(lease_key)
+
+
+def single_flight(key: str, fn: Callable[[], T], *, lease_seconds: int = SINGLE_FLIGHT_LEASE_SECONDS) -> T:
+    """
+    Run fn once for all concurrent callers with the same key.
+    Threads in this process wait on the leader's result; other processes see a cache lease
+    and pick up the leader's result from the cache for a few seconds after it lands.
+    The result must be picklable.
+    """
+    with _IN_FLIGHT_LOCK:
+        call = _IN_FLIGHT.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _IN_FLIGHT[key] = call
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _lead(key, fn, lease_seconds)
+        return call.result
+    except BaseException as exc:
+        call.error = exc
+        raise
+    finally:
+        with _IN_FLIGHT_LOCK:
+            _IN_FLIGHT.pop(key, None)
+        call.done.set()
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+from django.core.cache import cache
+
+from .models import Sleeve
+from .serializers import SleeveSerializer
+from .sleeve_versions import active_contents_prefetch
+from .hydration import hydrate_songs_completely
+
+SLEEVES_PAYLOAD_VERSION_CACHE_KEY = "sleeves:payload-version"
+# How long a process trusts the shared version before re-deriving it from the DB. Publishers
+# bump it on commit; this bounds how long a process on its own LocMem cache can miss that.
+SLEEVES_PAYLOAD_VERSION_TTL = int(os.environ.get("SLEEVES_PAYLOAD_VERSION_TTL_SECONDS", "60"))
+# Matches the Spotify track cache TTL, so hydrated metadata is not kept longer than hydration keeps it.
+SLEEVES_PAYLOAD_CACHE_TTL = int(os.environ.get("SLEEVES_PAYLOAD_CACHE_TTL_SECONDS", "3600"))
+# A payload built while Spotify was down or throttled is only kept long enough to absorb a burst.
+SLEEVES_PAYLOAD_PARTIAL_CACHE_TTL = int(os.environ.get("SLEEVES_PAYLOAD_PARTIAL_CACHE_TTL_SECONDS", "30"))
+
+
+def _payload_cache_key(version: str) -> str:
+    return f"sleeves:payload:{version}"
+
+
+def _payload_version_from_db() -> str:
+    """Digest of every sleeve row, contents_version included."""
+    fields = [field.attname for field in Sleeve._meta.concrete_fields]
+    rows = list(Sleeve.objects.order_by('pk').values_list(*fields))
+    body = json.dumps(rows, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+
+
+def _current_payload_version() -> str:
+    version = cache.get(SLEEVES_PAYLOAD_VERSION_CACHE_KEY)
+    if version is None:
+        version = _payload_version_from_db()
+        cache.add(SLEEVES_PAYLOAD_VERSION_CACHE_KEY, version, timeout=SLEEVES_PAYLOAD_VERSION_TTL)
+    return version
+
+
+def bump_sleeves_payload_version() -> str:
+    """Re-derive the version from the committed sleeves and share it with every reader."""
+    version = _payload_version_from_db()
+    cache.set(SLEEVES_PAYLOAD_VERSION_CACHE_KEY, version, timeout=SLEEVES_PAYLOAD_VERSION_TTL)
+    return version
+
+
+def _payload_etag(data: list[dict[str, Any]]) -> str:
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def build_sleeves_payload(version: str | None = None) -> dict[str, Any]:
+    """Serialize and hydrate every sleeve once, then store it under the current payload version."""
+    if version is None:
+        version = _current_payload_version()
+    sleeves = Sleeve.objects.prefetch_related(active_contents_prefetch()).all()
+    data = list(SleeveSerializer(sleeves, many=True).data)
+    complete = True
+    for sleeve in data:
+        complete = hydrate_songs_completely(sleeve.get("contents", [])) and complete
+
+    payload = {"version": version, "etag": _payload_etag(data), "data": data}
+    timeout = SLEEVES_PAYLOAD_CACHE_TTL if complete else SLEEVES_PAYLOAD_PARTIAL_CACHE_TTL
+    cache.set(_payload_cache_key(version), payload, timeout=timeout)
+    return payload
+
+
+def get_sleeves_payload() -> dict[str, Any]:
+    cached = cache.get(_payload_cache_key(_current_payload_version()))
+    if cached:
+        return cached
+    return build_sleeves_payload()
+
+
+def refresh_sleeves_payload() -> None:
+    """Move readers to the committed sleeves and build that payload right away so they never pay for the rebuild."""
+    build_sleeves_payload(bump_sleeves_payload_version())
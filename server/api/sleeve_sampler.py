@@ -0,0 +1,122 @@
+import random
+import threading
+from dataclasses import dataclass
+
+from .models import Sleeve
+from .sleeve_versions import active_contents
+
+RARITY_WEIGHT = {
+    'Common': 35,
+    'Uncommon': 25,
+    'Rare': 20,
+    'Epic': 15,
+    'Legendary': 5,
+}
+
+
+@dataclass(frozen=True)
+class SleeveOutcome:
+    song_id: str
+    rarity: str
+
+
+@dataclass(frozen=True)
+class AliasTable:
+    """Walker/Vose alias table: one uniform draw picks a column, a second coin picks the column or its alias."""
+    outcomes: tuple[SleeveOutcome, ...]
+    probabilities: tuple[float, ...]
+    aliases: tuple[int, ...]
+
+    def draw(self, rng: random.Random | None = None) -> SleeveOutcome:
+        scaled = (rng or random).random() * len(self.outcomes)
+        column = int(scaled)
+        if scaled - column < self.probabilities[column]:
+            return self.outcomes[column]
+        return self.outcomes[self.aliases[column]]
+
+    def draw_many(self, count: int, rng: random.Random | None = None) -> list[SleeveOutcome]:
+        source = rng or random
+        size = len(self.outcomes)
+        outcomes = self.outcomes
+        probabilities = self.probabilities
+        aliases = self.aliases
+        drawn: list[SleeveOutcome] = []
+        for scaled in [source.random() * size for _ in range(count)]:
+            column = int(scaled)
+            drawn.append(outcomes[column] if scaled - column < probabilities[column] else outcomes[aliases[column]])
+        return drawn
+
+
+def _entry_weight(weight: float | None, rarity: str) -> float:
+    return weight if weight is not None else RARITY_WEIGHT.get(rarity, 1)
+
+
+def build_alias_table(weighted_outcomes: list[tuple[SleeveOutcome, float]]) -> AliasTable | None:
+    if not weighted_outcomes:
+        return None
+
+    outcomes = tuple(outcome for outcome, _ in weighted_outcomes)
+    weights = [max(0.0, float(weight)) for _, weight in weighted_outcomes]
+    count = len(outcomes)
+    total = sum(weights)
+
+    probabilities = [1.0] * count
+    aliases = list(range(count))
+    if total <= 0:
+        # The linear sampler always landed on the first entry when nothing had weight.
+        aliases = [0] * count
+        probabilities = [1.0] + [0.0] * (count - 1)
+        return AliasTable(outcomes=outcomes, probabilities=tuple(probabilities), aliases=tuple(aliases))
+
+    scaled = [weight * count / total for weight in weights]
+    small = [index for index, value in enumerate(scaled) if value < 1.0]
+    large = [index for index, value in enumerate(scaled) if value >= 1.0]
+
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        probabilities[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] = (scaled[more] + scaled[less]) - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # Whatever is left only differs from 1.0 by floating point drift.
+    for index in large + small:
+        probabilities[index] = 1.0
+        aliases[index] = index
+
+    return AliasTable(outcomes=outcomes, probabilities=tuple(probabilities), aliases=tuple(aliases))
+
+
+def _build_sleeve_alias_table(sleeve: Sleeve) -> AliasTable | None:
+    rows = (
+        active_contents(sleeve)
+        .order_by('id')
+        .values_list('song_id', 'rarity', 'weight')
+    )
+    return build_alias_table([
+        (SleeveOutcome(song_id=song_id, rarity=rarity), _entry_weight(weight, rarity))
+        for song_id, rarity, weight in rows
+    ])
+
+
+_ALIAS_TABLES: dict[str, tuple[int, AliasTable | None]] = {}
+_ALIAS_TABLES_LOCK = threading.Lock()
+
+
+def sleeve_alias_table(sleeve: Sleeve) -> AliasTable | None:
+    """
+    Return the alias table for the sleeve's current contents version.
+    Tables are kept per process and rebuilt only when contents_version moves.
+    """
+    cached = _ALIAS_TABLES.get(sleeve.pk)
+    if cached is not None and cached[0] == sleeve.contents_version:
+        return cached[1]
+
+    table = _build_sleeve_alias_table(sleeve)
+    with _ALIAS_TABLES_LOCK:
+        _ALIAS_TABLES[sleeve.pk] = (sleeve.contents_version, table)
+    return table
@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import F, Max, Prefetch, QuerySet
+from django.utils import timezone
+
+from .models import Sleeve, SleeveSong, SleeveVersion
+from .song_previews import queue_version_preview_prefetch
+
+
+@dataclass(frozen=True)
+class SleeveEntry:
+    song_id: str
+    rarity: str
+    weight: float | None = None
+
+
+def active_contents(sleeve: Sleeve) -> QuerySet:
+    return SleeveSong.objects.filter(sleeve=sleeve, version_id=sleeve.active_version_id)
+
+
+def active_contents_prefetch() -> Prefetch:
+    """Prefetch only the published version's rows into sleeve.active_contents."""
+    return Prefetch(
+        'contents',
+        queryset=(
+            SleeveSong.objects
+            .filter(version_id=F('sleeve__active_version_id'))
+            .select_related('song')
+            .order_by('id')
+        ),
+        to_attr='active_contents',
+    )
+
+
+def build_sleeve_version(sleeve: Sleeve, entries: list[SleeveEntry]) -> SleeveVersion:
+    """Write a complete, unpublished contents version. Readers keep seeing the active one meanwhile."""
+    with transaction.atomic():
+        latest = SleeveVersion.objects.filter(sleeve=sleeve).aggregate(latest=Max('number'))['latest'] or 0
+        version = SleeveVersion.objects.create(sleeve=sleeve, number=latest + 1)
+        SleeveSong.objects.bulk_create([
+            SleeveSong(sleeve=sleeve, version=version, song_id=entry.song_id, rarity=entry.rarity, weight=entry.weight)
+            for entry in entries
+        ])
+    return version
+
+
+def publish_sleeve_version(version: SleeveVersion) -> None:
+    """Swap the sleeve's active-version pointer; contents_version moves with it so caches roll over."""
+    published_at = timezone.now()
+    with transaction.atomic():
+        SleeveVersion.objects.filter(pk=version.pk).update(published_at=published_at)
+        Sleeve.objects.filter(pk=version.sleeve_id).update(
+            active_version=version,
+            contents_version=F('contents_version') + 1,
+        )
+        queue_version_preview_prefetch(version.pk)
+    version.published_at = published_at
@@ -0,0 +1,130 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib import error
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import SleeveSong, Song, SongPreview
+from .preview import lookup_preview_snippet
+from .rate_limit import LANE_BATCH, LANE_INTERACTIVE
+
+SONG_PREVIEW_CONCURRENCY = int(os.environ.get("SONG_PREVIEW_CONCURRENCY", "4"))
+# Found previews are kept until this old, then looked up again in case the clip URL moved.
+SONG_PREVIEW_MAX_AGE = timedelta(days=float(os.environ.get("SONG_PREVIEW_MAX_AGE_DAYS", "30")))
+# Songs iTunes had no preview for are retried sooner.
+SONG_PREVIEW_MISS_MAX_AGE = timedelta(days=float(os.environ.get("SONG_PREVIEW_MISS_MAX_AGE_DAYS", "3")))
+SONG_PREVIEW_BATCH_LIMIT = 100
+# iTunes lookups one batch request may start; the rest come back unresolved so one caller cannot drain the budget.
+SONG_PREVIEW_MAX_COLD_LOOKUPS = int(os.environ.get("SONG_PREVIEW_MAX_COLD_LOOKUPS", "10"))
+
+
+def _is_fresh(row: SongPreview, now) -> bool:
+    max_age = SONG_PREVIEW_MAX_AGE if row.preview_url else SONG_PREVIEW_MISS_MAX_AGE
+    return row.resolved_at >= now - max_age
+
+
+def resolve_song_previews(
+    songs: list[Song],
+    *,
+    lane: str = LANE_INTERACTIVE,
+    concurrency: int = SONG_PREVIEW_CONCURRENCY,
+    max_lookups: int | None = None,
+) -> tuple[dict[str, str | None], list[str]]:
+    """
+    Return ({song id: preview url or None}, [song ids iTunes could not be asked about]).
+    Stored rows answer without a provider call; the rest are looked up a few at a time
+    and saved, hits and misses alike. Songs whose lookup failed are not stored.
+    With max_lookups, songs past that many lookups are left unresolved without asking iTunes.
+    """
+    if not songs:
+        return {}, []
+
+    now = timezone.now()
+    stored = {row.song_id: row for row in SongPreview.objects.filter(song__in=[song.id for song in songs])}
+    previews: dict[str, str | None] = {}
+    to_lookup: list[Song] = []
+    for song in songs:
+        row = stored.get(song.id)
+        if row is not None and _is_fresh(row, now):
+            previews[song.id] = row.preview_url
+        else:
+            to_lookup.append(song)
+
+    unresolved: list[str] = []
+    if max_lookups is not None and len(to_lookup) > max_lookups:
+        for song in to_lookup[max_lookups:]:
+            unresolved.append(song.id)
+            if song.id in stored:
+                previews[song.id] = stored[song.id].preview_url
+        to_lookup = to_lookup[:max_lookups]
+
+    if not to_lookup:
+        return previews, unresolved
+
+    def lookup(song: Song) -> tuple[bool, str | None]:
+        try:
+            snippet = lookup_preview_snippet(song.title, song.artist, lane=lane)
+        except (error.HTTPError, error.URLError, TimeoutError, ValueError):
+            return False, None
+        return True, snippet.preview_url if snippet else None
+
+    if concurrency <= 1 or len(to_lookup) == 1:
+        results = [lookup(song) for song in to_lookup]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(to_lookup)), thread_name_prefix="preview-lookup") as pool:
+            results = list(pool.map(lookup, to_lookup))
+
+    rows: list[SongPreview] = []
+    resolved_at = timezone.now()
+    for song, (answered, preview_url) in zip(to_lookup, results):
+        if not answered:
+            unresolved.append(song.id)
+            # A stale row is still better than nothing while iTunes is unavailable.
+            if song.id in stored:
+                previews[song.id] = stored[song.id].preview_url
+            continue
+        previews[song.id] = preview_url
+        rows.append(SongPreview(song_id=song.id, preview_url=preview_url, resolved_at=resolved_at))
+
+    if rows:
+        SongPreview.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['song'],
+            update_fields=['preview_url', 'resolved_at'],
+        )
+    return previews, unresolved
+
+
+def prefetch_version_previews(version_id: int) -> int:
+    """Resolve previews for every song in a sleeve version. Returns how many songs were checked."""
+    songs = list(Song.objects.filter(id__in=SleeveSong.objects.filter(version_id=version_id).values('song_id')))
+    resolve_song_previews(songs, lane=LANE_BATCH)
+    return len(songs)
+
+
+def _prefetch_in_background(version_id: int) -> None:
+    try:
+        prefetch_version_previews(version_id)
+    except Exception:
+        # Anything missed is resolved on the first play instead.
+        pass
+    finally:
+        close_old_connections()
+
+
+def queue_version_preview_prefetch(version_id: int) -> None:
+    """
+    Prefetch a newly published version's previews once the transaction commits.
+    Not a daemon thread, so a one-shot refresh run finishes the prefetch before exiting.
+    """
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_prefetch_in_background,
+            args=(version_id,),
+            name=f"preview-prefetch-{version_id}",
+        ).start()
+    )
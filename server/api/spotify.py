@@ -2,7 +2,9 @@ import base64
 import math
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 from urllib import error, parse, request
@@ -10,20 +12,31 @@ from urllib import error, parse, request
 
 from django.core.cache import cache
 
-SPOTIFY_AUTH_URL = "https://accounts.spotify.com/api/token"
-SPOTIFY_TRACKS_URL = "https://api.spotify.com/v1/tracks"
-SPOTIFY_SEARCH_URL = "https://api.spotify.com/v1/search"
-SPOTIFY_ARTIST_TOP_TRACKS_URL_TEMPLATE = "https://api.spotify.com/v1/artists/{artist_id}/top-tracks"
-SPOTIFY_ARTIST_ALBUMS_URL_TEMPLATE = "https://api.spotify.com/v1/artists/{artist_id}/albums"
-SPOTIFY_ALBUM_TRACKS_URL_TEMPLATE = "https://api.spotify.com/v1/albums/{album_id}/tracks"
+from . import circuit_breaker, http_transport, rate_limit
+from .single_flight import single_flight, single_flight_key
+
+# Overridable so load tests can point at fake_providers.py instead of the real API.
+SPOTIFY_AUTH_URL = os.environ.get("SPOTIFY_AUTH_URL", "https://accounts.spotify.com/api/token")
+SPOTIFY_API_BASE = os.environ.get("SPOTIFY_API_BASE", "https://api.spotify.com/v1").rstrip("/")
+SPOTIFY_TRACKS_URL = f"{SPOTIFY_API_BASE}/tracks"
+SPOTIFY_SEARCH_URL = f"{SPOTIFY_API_BASE}/search"
+SPOTIFY_ARTIST_TOP_TRACKS_URL_TEMPLATE = SPOTIFY_API_BASE + "/artists/{artist_id}/top-tracks"
+SPOTIFY_ARTIST_ALBUMS_URL_TEMPLATE = SPOTIFY_API_BASE + "/artists/{artist_id}/albums"
+SPOTIFY_ALBUM_TRACKS_URL_TEMPLATE = SPOTIFY_API_BASE + "/albums/{album_id}/tracks"
 TOKEN_CACHE_KEY = "spotify:client-token"
 THROTTLE_UNTIL_CACHE_KEY = "spotify:throttle-until"
 THROTTLE_LAST_PROBE_CACHE_KEY = "spotify:throttle-last-probe"
-DEFAULT_TRACK_CACHE_TTL = int(os.environ.get("SPOTIFY_TRACK_CACHE_TTL_SECONDS", "3600"))
-SPOTIFY_CLIENT_MIN_INTERVAL_SECONDS = float(os.environ.get("SPOTIFY_CLIENT_MIN_INTERVAL_SECONDS", "0.25"))
 SPOTIFY_MAX_RETRIES = int(os.environ.get("SPOTIFY_MAX_RETRIES", "2"))
 SPOTIFY_MAX_BACKOFF_SECONDS = int(os.environ.get("SPOTIFY_MAX_BACKOFF_SECONDS", "120"))
 SPOTIFY_BACKOFF_PROBE_INTERVAL_SECONDS = int(os.environ.get("SPOTIFY_BACKOFF_PROBE_INTERVAL_SECONDS", "15"))
+SPOTIFY_HTTP_TIMEOUT_SECONDS = float(os.environ.get("SPOTIFY_HTTP_TIMEOUT_SECONDS", "20"))
+# Reported in last_error_code when a circuit breaker refuses the call.
+CIRCUIT_OPEN_ERROR_CODE = 503
+SPOTIFY_FETCH_CONCURRENCY = int(os.environ.get("SPOTIFY_FETCH_CONCURRENCY", "4"))
+
+# Shared by every client in the process so chunked calls never have more than SPOTIFY_FETCH_CONCURRENCY requests in flight.
+_FETCH_POOL = ThreadPoolExecutor(max_workers=max(1, SPOTIFY_FETCH_CONCURRENCY), thread_name_prefix="spotify-fetch")
+_fetch_worker = threading.local()
 
 
 @dataclass
@@ -34,6 +47,16 @@ class SpotifyTrackData:
     artist_ids: tuple[str, ...]
     cover_url: str | None
     spotify_url: str | None
+    primary_artist_id: str | None = None
+
+
+@dataclass(frozen=True)
+class SpotifyChunkFailure:
+    kind: str
+    index: int
+    ids: tuple[str, ...]
+    error_code: int | None
+    retry_after_seconds: int | None
 
 
 @dataclass
@@ -44,12 +67,16 @@ class SpotifyArtistData:
     spotify_url: str | None
 
 class SpotifyClient:
-    def __init__(self) -> None:
+    def __init__(self, lane: str = rate_limit.LANE_INTERACTIVE) -> None:
+        self.lane = lane
         self.client_id = os.environ.get("SPOTIFY_CLIENT_ID")
         self.client_secret = os.environ.get("SPOTIFY_CLIENT_SECRET")
         self.last_error_code: int | None = None
         self.last_retry_after_seconds: int | None = None
-        self._last_request_ts = 0.0
+        # Ids Spotify answered for but had no track for (deleted or region-locked), from the last get_tracks.
+        self.last_missing_track_ids: tuple[str, ...] = ()
+        # Chunks of the last multi-request call that got no answer; error_code is None for network failures.
+        self.last_failed_chunks: tuple[SpotifyChunkFailure, ...] = ()
 
     @property
     def is_configured(self) -> bool:
@@ -58,6 +85,7 @@ class SpotifyClient:
     def _clear_last_error(self) -> None:
         self.last_error_code = None
         self.last_retry_after_seconds = None
+        self.last_failed_chunks = ()
 
     def _capture_http_error(self, exc: error.HTTPError) -> None:
         self.last_error_code = exc.code
@@ -67,11 +95,14 @@ class SpotifyClient:
         except (TypeError, ValueError):
             self.last_retry_after_seconds = None
 
-    def _pace_requests(self) -> None:
-        elapsed = time.monotonic() - self._last_request_ts
-        if elapsed < SPOTIFY_CLIENT_MIN_INTERVAL_SECONDS:
-            time.sleep(SPOTIFY_CLIENT_MIN_INTERVAL_SECONDS - elapsed)
-        self._last_request_ts = time.monotonic()
+    def _take_rate_limit_token(self, endpoint: str) -> bool:
+        wait = rate_limit.acquire("spotify", endpoint, self.lane)
+        if wait > 0:
+            # Treat an exhausted shared budget like a 429 so callers surface the same retry hint.
+            self.last_error_code = 429
+            self.last_retry_after_seconds = max(1, math.ceil(wait))
+            return False
+        return True
 
     def _global_backoff_remaining_seconds(self) -> int:
         throttle_until = cache.get(THROTTLE_UNTIL_CACHE_KEY)
@@ -113,7 +144,15 @@ class SpotifyClient:
         cache.set(THROTTLE_LAST_PROBE_CACHE_KEY, now, timeout=interval)
         return True
 
-    def _request_json(self, req: request.Request, timeout: int, *, allow_retry: bool = True) -> dict[str, Any] | None:
+    def _request_json(
+        self,
+        req: request.Request,
+        timeout: float,
+        *,
+        allow_retry: bool = True,
+        endpoint: str = "api",
+        circuit: tuple[str, str] | None = None,
+    ) -> dict[str, Any] | None:
         attempts = max(1, SPOTIFY_MAX_RETRIES + 1) if allow_retry else 1
         for attempt in range(attempts):
             backoff_seconds = self._global_backoff_remaining_seconds()
@@ -128,21 +167,74 @@ class SpotifyClient:
                 self.last_error_code = 429
                 self.last_retry_after_seconds = backoff_seconds
                 return None
-            self._pace_requests()
+            if circuit is not None and not circuit_breaker.allow_request(*circuit):
+                # Fail fast while the endpoint is down instead of waiting out a full timeout.
+                self.last_error_code = CIRCUIT_OPEN_ERROR_CODE
+                self.last_retry_after_seconds = max(1, circuit_breaker.open_seconds_remaining(*circuit))
+                return None
+            if not self._take_rate_limit_token(endpoint):
+                if circuit is not None:
+                    circuit_breaker.release_probe(*circuit)
+                return None
             try:
-                with request.urlopen(req, timeout=timeout) as resp:
+                with http_transport.urlopen(req, timeout=timeout) as resp:
                     self._clear_global_backoff()
-                    return json.loads(resp.read().decode("utf-8"))
+                    raw = resp.read()
             except error.HTTPError as exc:
                 self._capture_http_error(exc)
+                if circuit is not None:
+                    if circuit_breaker.is_failure_status(exc.code):
+                        circuit_breaker.record_failure(*circuit)
+                    else:
+                        circuit_breaker.release_probe(*circuit)
                 if exc.code == 429 and attempt < attempts - 1:
                     self._set_global_backoff(self.last_retry_after_seconds)
                     continue
                 return None
-            except (error.URLError, TimeoutError, ValueError):
+            except (error.URLError, TimeoutError):
+                if circuit is not None:
+                    circuit_breaker.record_failure(*circuit)
+                return None
+            if circuit is not None:
+                circuit_breaker.record_success(*circuit)
+            try:
+                return json.loads(raw.decode("utf-8"))
+            except ValueError:
                 return None
         return None
 
+    def _request_many(self, reqs: list[request.Request], circuit: tuple[str, str]) -> list[tuple[dict[str, Any] | None, int | None, int | None]]:
+        """
+        Run independent GETs on the shared fetch pool and return (payload, error code, retry after) in request order.
+        Each request still goes through _request_json, so the shared rate limit and global backoff apply per chunk.
+        """
+        def run(req: request.Request):
+            worker = SpotifyClient(lane=self.lane)
+            worker.client_id, worker.client_secret = self.client_id, self.client_secret
+            payload = worker._request_json(req, timeout=SPOTIFY_HTTP_TIMEOUT_SECONDS, circuit=circuit)
+            return payload, worker.last_error_code, worker.last_retry_after_seconds
+
+        def run_in_pool(req: request.Request):
+            _fetch_worker.active = True
+            return run(req)
+
+        # Already on a pool thread (or nothing to overlap): run inline instead of waiting on our own pool.
+        if len(reqs) <= 1 or getattr(_fetch_worker, "active", False):
+            return [run(req) for req in reqs]
+        return list(_FETCH_POOL.map(run_in_pool, reqs))
+
+    def _record_chunk_failures(self, failures: list[SpotifyChunkFailure]) -> None:
+        self.last_failed_chunks = self.last_failed_chunks + tuple(failures)
+        if not failures or self.last_error_code is not None:
+            return
+        first = next((failure for failure in failures if failure.error_code is not None), None)
+        if first is not None:
+            self.last_error_code = first.error_code
+            self.last_retry_after_seconds = max(
+                (failure.retry_after_seconds for failure in failures if failure.retry_after_seconds),
+                default=None,
+            )
+
     def _token_from_spotify(self) -> tuple[str, int]:
         creds = f"{self.client_id}:{self.client_secret}".encode("utf-8")
         auth = base64.b64encode(creds).decode("ascii")
@@ -156,7 +248,7 @@ class SpotifyClient:
             },
             method="POST",
         )
-        payload = self._request_json(req, timeout=15, allow_retry=True)
+        payload = self._request_json(req, timeout=15, allow_retry=True, endpoint="auth")
         if not payload or "access_token" not in payload:
             raise ValueError("spotify auth response missing access token")
         data = payload
@@ -179,35 +271,70 @@ class SpotifyClient:
         cache.set(TOKEN_CACHE_KEY, token, timeout=ttl)
         return token
 
+    def _coalesced(self, key: str, fetch):
+        """Share one outbound call between identical concurrent requests, including the error it hit."""
+        def run():
+            result = fetch()
+            return (
+                result,
+                self.last_error_code,
+                self.last_retry_after_seconds,
+                self.last_missing_track_ids,
+                self.last_failed_chunks,
+            )
+
+        (
+            result,
+            self.last_error_code,
+            self.last_retry_after_seconds,
+            self.last_missing_track_ids,
+            self.last_failed_chunks,
+        ) = single_flight(key, run)
+        return result
+
     def get_tracks(self, track_ids: list[str]) -> dict[str, SpotifyTrackData]:
         self._clear_last_error()
+        self.last_missing_track_ids = ()
         token = self.access_token()
         if not token or not track_ids:
             return {}
 
         deduped_ids = list(dict.fromkeys(track_ids))
+        return self._coalesced(
+            single_flight_key("spotify-tracks", *sorted(deduped_ids)),
+            lambda: self._fetch_tracks(token, deduped_ids),
+        )
+
+    def _fetch_tracks(self, token: str, deduped_ids: list[str]) -> dict[str, SpotifyTrackData]:
         results: dict[str, SpotifyTrackData] = {}
+        missing: list[str] = []
+        failures: list[SpotifyChunkFailure] = []
 
-        for i in range(0, len(deduped_ids), 50):
-            chunk = deduped_ids[i:i + 50]
-            params = parse.urlencode({"ids": ",".join(chunk)})
-            req = request.Request(
-                f"{SPOTIFY_TRACKS_URL}?{params}",
+        chunks = [deduped_ids[i:i + 50] for i in range(0, len(deduped_ids), 50)]
+        reqs = [
+            request.Request(
+                f"{SPOTIFY_TRACKS_URL}?{parse.urlencode({'ids': ','.join(chunk)})}",
                 headers={"Authorization": f"Bearer {token}"},
                 method="GET",
             )
-            payload = self._request_json(req, timeout=20)
-            if not payload:
+            for chunk in chunks
+        ]
+        for index, (chunk, (payload, error_code, retry_after)) in enumerate(zip(chunks, self._request_many(reqs, circuit_breaker.SPOTIFY_TRACKS))):
+            if payload is None:
+                failures.append(SpotifyChunkFailure("tracks", index, tuple(chunk), error_code, retry_after))
                 continue
 
             for track in payload.get("tracks", []):
                 parsed_track = _parse_track_payload(track)
                 if parsed_track:
                     results[parsed_track.track_id] = parsed_track
+            missing.extend(track_id for track_id in chunk if track_id not in results)
 
+        self.last_missing_track_ids = tuple(missing)
+        self._record_chunk_failures(failures)
         return results
 
-    def search_artist_tracks(self, artist_keyword: str, limit: int = 10) -> list[SpotifyTrackData]:
+    def search_artist_tracks(self, artist_keyword: str, limit: int = 10, timeout: float = SPOTIFY_HTTP_TIMEOUT_SECONDS) -> list[SpotifyTrackData]:
         self._clear_last_error()
         token = self.access_token()
         if not token:
@@ -221,7 +348,7 @@ class SpotifyClient:
             headers={"Authorization": f"Bearer {token}"},
             method="GET",
         )
-        payload = self._request_json(req, timeout=20)
+        payload = self._request_json(req, timeout=timeout, circuit=circuit_breaker.SPOTIFY_SEARCH)
         if not payload:
             return []
 
@@ -241,13 +368,19 @@ class SpotifyClient:
             return []
 
         safe_limit = max(1, min(limit, 20))
+        return self._coalesced(
+            single_flight_key("spotify-artist-search", cleaned_keyword.casefold(), safe_limit),
+            lambda: self._fetch_artists(token, cleaned_keyword, safe_limit),
+        )
+
+    def _fetch_artists(self, token: str, cleaned_keyword: str, safe_limit: int) -> list[SpotifyArtistData]:
         params = parse.urlencode({"q": cleaned_keyword, "type": "artist", "limit": safe_limit})
         req = request.Request(
             f"{SPOTIFY_SEARCH_URL}?{params}",
             headers={"Authorization": f"Bearer {token}"},
             method="GET",
         )
-        payload = self._request_json(req, timeout=20)
+        payload = self._request_json(req, timeout=SPOTIFY_HTTP_TIMEOUT_SECONDS, circuit=circuit_breaker.SPOTIFY_SEARCH)
         if not payload:
             return []
 
@@ -272,7 +405,7 @@ class SpotifyClient:
             headers={"Authorization": f"Bearer {token}"},
             method="GET",
         )
-        payload = self._request_json(req, timeout=20)
+        payload = self._request_json(req, timeout=SPOTIFY_HTTP_TIMEOUT_SECONDS, circuit=circuit_breaker.SPOTIFY_ALBUMS)
         if not payload:
             return []
 
@@ -293,66 +426,90 @@ class SpotifyClient:
             return []
 
         safe_limit = max(1, min(limit, 200))
-        album_ids: list[str] = []
-        offset = 0
+        headers = {"Authorization": f"Bearer {token}"}
+        failures: list[SpotifyChunkFailure] = []
 
-        while len(album_ids) < safe_limit:
+        def album_page_request(offset: int) -> request.Request:
             params = parse.urlencode({
                 "include_groups": "album,single",
                 "market": market,
                 "limit": 50,
                 "offset": offset,
             })
-            req = request.Request(
+            return request.Request(
                 f"{SPOTIFY_ARTIST_ALBUMS_URL_TEMPLATE.format(artist_id=parse.quote(cleaned_artist_id))}?{params}",
-                headers={"Authorization": f"Bearer {token}"},
+                headers=headers,
                 method="GET",
             )
-            payload = self._request_json(req, timeout=20)
-            if not payload or not isinstance(payload, dict):
-                break
-            items = payload.get("items", [])
-            if not items:
-                break
 
-            for album in items:
+        # The first page tells us how many albums there are; the rest of the pages are fetched together.
+        first_page = self._request_json(
+            album_page_request(0),
+            timeout=SPOTIFY_HTTP_TIMEOUT_SECONDS,
+            circuit=circuit_breaker.SPOTIFY_ALBUMS,
+        )
+        if not first_page or not isinstance(first_page, dict):
+            # Recorded so callers can tell a failed fetch from an artist with no albums.
+            self._record_chunk_failures([
+                SpotifyChunkFailure(
+                    "artist-albums",
+                    0,
+                    (cleaned_artist_id,),
+                    self.last_error_code,
+                    self.last_retry_after_seconds,
+                )
+            ])
+            return []
+        pages = [first_page]
+        total = first_page.get("total") or 0
+        if len(first_page.get("items", [])) >= 50 and total > 50:
+            offsets = list(range(50, min(total, safe_limit), 50))
+            for index, (payload, error_code, retry_after) in enumerate(
+                self._request_many([album_page_request(offset) for offset in offsets], circuit_breaker.SPOTIFY_ALBUMS),
+                start=1,
+            ):
+                if not isinstance(payload, dict):
+                    failures.append(SpotifyChunkFailure("artist-albums", index, (cleaned_artist_id,), error_code, retry_after))
+                    continue
+                pages.append(payload)
+
+        album_ids: list[str] = []
+        for page in pages:
+            for album in page.get("items", []):
                 aid = album.get("id")
                 if aid and aid not in album_ids:
                     album_ids.append(aid)
-                    if len(album_ids) >= safe_limit:
-                        break
-
-            if len(items) < 50:
-                break
-            offset += 50
+        album_ids = album_ids[:safe_limit]
 
         track_ids: list[str] = []
         seen_track_ids: set[str] = set()
-        for album_id in album_ids:
-            params = parse.urlencode({"market": market, "limit": 50})
-            req = request.Request(
-                f"{SPOTIFY_ALBUM_TRACKS_URL_TEMPLATE.format(album_id=parse.quote(album_id))}?{params}",
-                headers={"Authorization": f"Bearer {token}"},
-                method="GET",
-            )
-            payload = self._request_json(req, timeout=20)
-            if not payload or not isinstance(payload, dict):
-                continue
-
-            for track in payload.get("items", []):
-                tid = track.get("id")
-                if tid and tid not in seen_track_ids:
-                    seen_track_ids.add(tid)
-                    track_ids.append(tid)
-                if len(track_ids) >= safe_limit:
-                    break
+        # Albums go out one pool-sized wave at a time so we stop asking once the limit is reached.
+        wave_size = max(1, SPOTIFY_FETCH_CONCURRENCY)
+        for start in range(0, len(album_ids), wave_size):
+            wave = album_ids[start:start + wave_size]
+            reqs = [
+                request.Request(
+                    f"{SPOTIFY_ALBUM_TRACKS_URL_TEMPLATE.format(album_id=parse.quote(album_id))}?{parse.urlencode({'market': market, 'limit': 50})}",
+                    headers=headers,
+                    method="GET",
+                )
+                for album_id in wave
+            ]
+            for offset, (album_id, (payload, error_code, retry_after)) in enumerate(zip(wave, self._request_many(reqs, circuit_breaker.SPOTIFY_ALBUMS))):
+                if not isinstance(payload, dict):
+                    failures.append(SpotifyChunkFailure("album-tracks", start + offset, (album_id,), error_code, retry_after))
+                    continue
+                for track in payload.get("items", []):
+                    tid = track.get("id")
+                    if tid and tid not in seen_track_ids:
+                        seen_track_ids.add(tid)
+                        track_ids.append(tid)
             if len(track_ids) >= safe_limit:
                 break
+        track_ids = track_ids[:safe_limit]
 
-        if not track_ids:
-            return []
-
-        track_map = self.get_tracks(track_ids)
+        track_map = self.get_tracks(track_ids) if track_ids else {}
+        self._record_chunk_failures(failures)
         return [track_map[tid] for tid in track_ids if tid in track_map]
 
 
@@ -396,62 +553,3 @@ def _parse_artist_payload(artist: dict[str, Any] | None) -> SpotifyArtistData |
         image_url=image_url,
         spotify_url=artist.get("external_urls", {}).get("spotify"),
     )
-
-
-
-def _song_cache_key(song_id: str) -> str:
-    return f"spotify:song:{song_id}"
-
-
-def hydrate_songs_from_spotify(song_rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    """
-    Fill human-readable song fields from Spotify and cache the resolved payload in Django cache.
-    Cache entries are intentionally short-lived to avoid persistent storage of Spotify metadata.
-    """
-    if not song_rows:
-        return song_rows
-
-    client = SpotifyClient()
-    if not client.is_configured:
-        return song_rows
-
-    to_lookup: list[str] = []
-    positions_by_track_id: dict[str, list[int]] = {}
-
-    for idx, song in enumerate(song_rows):
-        song_id = song.get("id")
-        track_id = song.get("spotifyTrackId")
-        if not song_id or not track_id:
-            continue
-
-        cached_song = cache.get(_song_cache_key(song_id))
-        if cached_song:
-            song.update(cached_song)
-            continue
-
-        positions_by_track_id.setdefault(track_id, []).append(idx)
-        to_lookup.append(track_id)
-
-    fetched = client.get_tracks(to_lookup)
-    now = int(time.time())
-    timeout = DEFAULT_TRACK_CACHE_TTL
-
-    for track_id, indices in positions_by_track_id.items():
-        data = fetched.get(track_id)
-        if not data:
-            continue
-
-        for idx in indices:
-            song = song_rows[idx]
-            hydrated = {
-                "title": data.title or song.get("title"),
-                "artist": data.artist or song.get("artist"),
-                "coverUrl": data.cover_url or song.get("coverUrl"),
-                "spotifyUrl": data.spotify_url or song.get("spotifyUrl"),
-                "spotifyTrackId": data.track_id,
-                "_spotifyCachedAt": now,
-            }
-            song.update(hydrated)
-            cache.set(_song_cache_key(song["id"]), hydrated, timeout=timeout)
-
-    return song_rows
\ No newline at end of file
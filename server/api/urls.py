@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('songs/', views.songs_list, name='songs_list'),
+    path('songs/previews/', views.song_previews_batch, name='song_previews_batch'),
+    path('songs/<str:song_id>/preview', views.song_preview, name='song_preview'),
     path('sleeves/', views.sleeves_list, name='sleeves_list'),
     path('inventory/', views.inventory_list, name='inventory_list'),
     path('inventory/reroll/', views.reroll_inventory_song, name='reroll_inventory_song'),
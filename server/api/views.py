@@ -1,21 +1,24 @@
 import random
 import re
 import base64
+import threading
+import time
 from pathlib import Path
+from urllib import error
 from django.db import transaction
 from django.db.models import Q
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import date
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
-from .models import Sleeve, SleeveSong, OwnedSong, Song, MarketListing, Profile, FriendRequest
+from .models import Sleeve, OwnedSong, Song, MarketListing, Profile, FriendRequest
 from .serializers import (
-    SleeveSerializer,
     OwnedSongSerializer,
     SongSerializer,
     UserSerializer,
@@ -23,13 +26,25 @@ from .serializers import (
     FriendUserSerializer,
     FriendRequestSerializer,
 )
-from .spotify import SpotifyClient, hydrate_songs_from_spotify
-from .preview import search_track_genre
-from .preview import AppleTrackData, search_artist_song_candidates, search_track_genre
+from .spotify import CIRCUIT_OPEN_ERROR_CODE, SpotifyClient
+from .hydration import hydrate_songs_from_spotify
+from .preview import AppleTrackData, lookup_artist_song_candidates
+from .genre_enrichment import UNKNOWN_GENRE, queue_genre_lookup
+from .song_previews import SONG_PREVIEW_BATCH_LIMIT, SONG_PREVIEW_MAX_COLD_LOOKUPS, resolve_song_previews
+from .sleeve_sampler import sleeve_alias_table
+from .sleeve_catalog import get_sleeves_payload
+from .wallet import claim_daily_bonus, credit_wallet, debit_wallet
+from .leveling import xp_required_for_next_level
+from .candidate_cache import cached_artist_candidates
+from .artist_catalog import catalog_candidates
+from .matching import artist_key_positions, best_catalog_match, compiled_tracks, normalize_artist_text
+from .provider_race import race_candidate_sources, remaining_timeout
+from . import circuit_breaker
 
 DAILY_LOGIN_BONUS = 100
 DAILY_LOGIN_LEVEL_BONUS_STEP = 40
 SLEEVE_OPEN_XP_REWARD = 50
+MAX_SLEEVE_OPEN_BATCH = 10
 MAX_PROFILE_AVATAR_BYTES = 5 * 1024 * 1024
 ALLOWED_AVATAR_MIME_TYPES = {
     'image/png',
@@ -87,15 +102,6 @@ def _profile_background_url(filename: str) -> str | None:
         return None
     return f"/backgrounds/{cleaned}"
 
-RARITY_WEIGHT = {
-    'Common': 35,
-    'Uncommon': 25,
-    'Rare': 20,
-    'Epic': 15,
-    'Legendary': 5,
-}
-
-
 RARITY_RANK = {
     'Common': 1,
     'Uncommon': 2,
@@ -105,9 +111,9 @@ RARITY_RANK = {
 }
 
 
-def _roll_rarity_from_inputs(input_rarities: list[str]) -> str:
+def _reroll_rarity_weights(input_rarities: list[str]) -> dict[str, float]:
     bonus = max(0, sum(RARITY_RANK.get(r, 1) for r in input_rarities) - 3)
-    weights = {
+    return {
         'Common': max(5.0, 50.0 - (3.0 * bonus)),
         'Uncommon': max(8.0, 25.0 - (1.2 * bonus)),
         'Rare': 15.0 + (1.5 * bonus),
@@ -115,6 +121,9 @@ def _roll_rarity_from_inputs(input_rarities: list[str]) -> str:
         'Legendary': 2.0 + (1.0 * bonus),
     }
 
+
+def _roll_rarity_from_inputs(input_rarities: list[str]) -> str:
+    weights = _reroll_rarity_weights(input_rarities)
     total = sum(weights.values())
     roll = random.random() * total
     chosen = 'Common'
@@ -145,45 +154,8 @@ def _rarity_from_apple_catalog_position(position: int | None, total_tracks: int)
     return 'Legendary'
 
 def _best_apple_catalog_match_position(title: str | None, artist: str | None, catalog: list[AppleTrackData]) -> int | None:
-    wanted_title = (title or "").strip().casefold()
-    wanted_artist = (artist or "").strip().casefold()
-    if not wanted_title or not catalog:
-        return None
-
-    best_index = None
-    best_score = -1
-    for index, track in enumerate(catalog):
-        title_score = 0
-        track_title = (track.title or "").strip().casefold()
-        track_artist = (track.artist or "").strip().casefold()
-
-        if track_title == wanted_title:
-            title_score = 6
-        elif wanted_title in track_title or track_title in wanted_title:
-            title_score = 4
-        elif wanted_title and track_title:
-            wanted_tokens = {token for token in re.split(r"\W+", wanted_title) if token}
-            track_tokens = {token for token in re.split(r"\W+", track_title) if token}
-            overlap = len(wanted_tokens & track_tokens)
-            if overlap >= 2:
-                title_score = 2
-
-        # Do not allow artist-only matches; they bias to the first (most popular) item.
-        if title_score == 0:
-            continue
-
-        score = title_score
-
-        if wanted_artist and track_artist == wanted_artist:
-            score += 4
-        elif wanted_artist and (wanted_artist in track_artist or track_artist in wanted_artist):
-            score += 2
-
-        if score > best_score:
-            best_score = score
-            best_index = index
-
-    return best_index if best_score > 0 else None
+    # Artist-only matches are not allowed; they would bias to the first (most popular) item.
+    return best_catalog_match(compiled_tracks(catalog), title, artist)
 
 def _rarity_from_artist_rank(rank: int | None) -> str | None:
     if rank is None or rank <= 0:
@@ -199,13 +171,12 @@ def _rarity_from_artist_rank(rank: int | None) -> str | None:
     return 'Common'
 
 def _upsert_song_from_spotify_track(track) -> Song:
-    apple_genre = search_track_genre(track.title or "", track.artist)
-    resolved_genre = apple_genre or 'Unknown'
+    # Genre is resolved in the background so no iTunes lookup runs inside the write transaction.
     defaults = {
         'title': track.title or track.track_id,
         'artist': track.artist or 'Unknown Artist',
         'cover_url': track.cover_url,
-        'genre': resolved_genre,
+        'genre': UNKNOWN_GENRE,
         'spotify_track_id': track.track_id,
         'spotify_url': track.spotify_url,
     }
@@ -218,7 +189,7 @@ def _upsert_song_from_spotify_track(track) -> Song:
     if not created:
         changed_fields = []
         for field, value in defaults.items():
-            if field == 'genre' and value == 'Unknown':
+            if field == 'genre' and value == UNKNOWN_GENRE:
                 continue
             if value and getattr(song, field) != value:
                 setattr(song, field, value)
@@ -226,6 +197,7 @@ def _upsert_song_from_spotify_track(track) -> Song:
         if changed_fields:
             song.save(update_fields=changed_fields)
 
+    queue_genre_lookup(song)
     return song
 
 def _upsert_song_from_apple_track(track: AppleTrackData) -> Song:
@@ -233,7 +205,7 @@ def _upsert_song_from_apple_track(track: AppleTrackData) -> Song:
         'title': track.title or track.track_id,
         'artist': track.artist or 'Unknown Artist',
         'cover_url': track.cover_url,
-        'genre': track.genre or search_track_genre(track.title or "", track.artist) or 'Unknown',
+        'genre': track.genre or UNKNOWN_GENRE,
         'spotify_track_id': None,
         'spotify_url': track.track_view_url,
     }
@@ -246,7 +218,7 @@ def _upsert_song_from_apple_track(track: AppleTrackData) -> Song:
     if not created:
         changed_fields = []
         for field, value in defaults.items():
-            if field == 'genre' and value == 'Unknown':
+            if field == 'genre' and value == UNKNOWN_GENRE:
                 continue
             if value is not None and getattr(song, field) != value:
                 setattr(song, field, value)
@@ -254,27 +226,14 @@ def _upsert_song_from_apple_track(track: AppleTrackData) -> Song:
         if changed_fields:
             song.save(update_fields=changed_fields)
 
+    queue_genre_lookup(song)
     return song
 
 
-def _normalize_artist_text(value: str | None) -> str:
-    return re.sub(r"[^a-z0-9]+", "", (value or "").lower())
-
-
 def _filter_tracks_for_locked_artist(candidates: list, artist_id: str, artist_keyword: str) -> list:
-    normalized_keyword = _normalize_artist_text(artist_keyword)
-    filtered = []
-    for track in candidates:
-        primary_artist_id = getattr(track, "primary_artist_id", None)
-        track_artist_text = getattr(track, "artist", None)
-        if artist_id and primary_artist_id == artist_id:
-            filtered.append(track)
-            continue
-        if artist_id:
-            continue
-        if normalized_keyword and normalized_keyword in _normalize_artist_text(track_artist_text):
-            filtered.append(track)
-    return filtered
+    if artist_id:
+        return [track for track in candidates if getattr(track, "primary_artist_id", None) == artist_id]
+    return [candidates[position] for position in artist_key_positions(candidates, artist_keyword)]
 
 
 def _dedupe_tracks_by_id(candidates: list) -> list:
@@ -291,10 +250,27 @@ def _dedupe_tracks_by_id(candidates: list) -> list:
     return deduped
 
 
-def _progressive_apple_candidates(artist_keyword: str, stages: tuple[int, ...] = (25, 60, 120)) -> list[AppleTrackData]:
+def _progressive_apple_candidates(
+    artist_keyword: str,
+    stages: tuple[int, ...] = (25, 60, 120),
+    *,
+    deadline: float | None = None,
+    cancelled: threading.Event | None = None,
+) -> list[AppleTrackData] | None:
+    """Widen the Apple search stage by stage. Returns None if the deadline or a cancel cut it short."""
     best: list[AppleTrackData] = []
     for limit in stages:
-        candidates = search_artist_song_candidates(artist_keyword, limit=limit)
+        timeout = remaining_timeout(deadline, 15)
+        if timeout <= 0 or (cancelled is not None and cancelled.is_set()):
+            return None
+        try:
+            candidates = lookup_artist_song_candidates(artist_keyword, limit=limit, timeout=timeout)
+        except (error.HTTPError, error.URLError, TimeoutError, ValueError):
+            # iTunes failed or refused the call, not an artist without tracks: keep what earlier stages
+            # found, and keep an empty result out of the candidate cache.
+            return best or None
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
         if len(candidates) > len(best):
             best = candidates
 
@@ -309,10 +285,18 @@ def _progressive_spotify_keyword_candidates(
     spotify_client: SpotifyClient,
     artist_keyword: str,
     stages: tuple[int, ...] = (10, 25, 60),
-) -> list:
+    *,
+    deadline: float | None = None,
+    cancelled: threading.Event | None = None,
+) -> list | None:
     best: list = []
     for limit in stages:
-        candidates = spotify_client.search_artist_tracks(artist_keyword, limit=limit)
+        timeout = remaining_timeout(deadline, 20)
+        if timeout <= 0 or (cancelled is not None and cancelled.is_set()):
+            return None
+        candidates = spotify_client.search_artist_tracks(artist_keyword, limit=limit, timeout=timeout)
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
         deduped = _dedupe_tracks_by_id(candidates)
         if len(deduped) > len(best):
             best = deduped
@@ -324,6 +308,33 @@ def _progressive_spotify_keyword_candidates(
     return best
 
 
+def _spotify_keyword_candidates_or_none(
+    spotify_client: SpotifyClient,
+    artist_keyword: str,
+    *,
+    deadline: float | None = None,
+    cancelled: threading.Event | None = None,
+) -> list | None:
+    candidates = _progressive_spotify_keyword_candidates(
+        spotify_client,
+        artist_keyword,
+        deadline=deadline,
+        cancelled=cancelled,
+    )
+    if not candidates and spotify_client.last_error_code is not None:
+        # An empty list caused by a provider error must not be cached as "artist has no tracks".
+        return None
+    return candidates
+
+
+def _local_reroll_songs(artist_keyword: str, limit: int = 200) -> list[Song]:
+    """Songs already in the database for this artist, used when the providers are unreachable."""
+    if not normalize_artist_text(artist_keyword):
+        return []
+    songs = list(Song.objects.filter(artist__icontains=artist_keyword.strip()).order_by('id')[:limit])
+    return [songs[position] for position in artist_key_positions(songs, artist_keyword)]
+
+
 def _profile_avatar_url(profile: Profile):
     avatar_image = getattr(profile, 'avatar_image', None)
     avatar_mime_type = getattr(profile, 'avatar_mime_type', None)
@@ -336,29 +347,10 @@ def _profile_avatar_url(profile: Profile):
             return profile.avatar_url
     return profile.avatar_url
 
-def _xp_required_for_next_level(level: int) -> int:
-    return max(500, 500 * max(1, level))
-
-
 def _daily_login_bonus_for_level(level: int) -> int:
     return DAILY_LOGIN_BONUS + (max(1, level) - 1) * DAILY_LOGIN_LEVEL_BONUS_STEP
 
 
-def _grant_profile_xp(profile: Profile, amount: int) -> bool:
-    if amount <= 0:
-        return False
-
-    profile.level = max(1, int(profile.level or 1))
-    profile.xp = max(0, int(profile.xp or 0)) + amount
-    leveled_up = False
-
-    while profile.xp >= _xp_required_for_next_level(profile.level):
-        profile.xp -= _xp_required_for_next_level(profile.level)
-        profile.level += 1
-        leveled_up = True
-
-    return leveled_up
-
 def _serialize_profile_response(user: User):
     owned_qs = OwnedSong.objects.filter(owner=user).select_related('song').order_by('-obtained_at')
     songs_collected = owned_qs.count()
@@ -401,7 +393,7 @@ def _serialize_profile_response(user: User):
         'wallet': wallet,
         'level': level,
         'xp': xp,
-        'xpToNextLevel': _xp_required_for_next_level(level),
+        'xpToNextLevel': xp_required_for_next_level(level),
         'dailyCoins': _daily_login_bonus_for_level(level),
         'avatarUrl': avatar_url,
         'joinedAt': user.date_joined.isoformat(),
@@ -422,18 +414,48 @@ def _serialize_profile_response(user: User):
 def songs_list(request):
     songs = Song.objects.all()
     serializer = SongSerializer(songs, many=True)
-    data = hydrate_songs_from_spotify(list(serializer.data))
+    data = hydrate_songs_from_spotify(list(serializer.data), background=True)
     return Response(data)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def song_preview(request, song_id):
+    song = get_object_or_404(Song, id=song_id)
+    previews, unresolved = resolve_song_previews([song])
+    if song.id in unresolved and previews.get(song.id) is None:
+        return Response({'detail': 'preview lookup is temporarily unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({'songId': song.id, 'previewUrl': previews.get(song.id)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def song_previews_batch(request):
+    song_ids = list(dict.fromkeys(
+        song_id.strip() for song_id in (request.query_params.get('ids') or '').split(',') if song_id.strip()
+    ))
+    if not song_ids:
+        return Response({'detail': 'ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(song_ids) > SONG_PREVIEW_BATCH_LIMIT:
+        return Response(
+            {'detail': f'at most {SONG_PREVIEW_BATCH_LIMIT} ids per request'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    previews, unresolved = resolve_song_previews(
+        list(Song.objects.filter(id__in=song_ids)),
+        max_lookups=SONG_PREVIEW_MAX_COLD_LOOKUPS,
+    )
+    return Response({'previews': previews, 'unresolved': unresolved})
+
+
 @api_view(['GET'])
 def sleeves_list(request):
-    sleeves = Sleeve.objects.prefetch_related('contents__song').all()
-    serializer = SleeveSerializer(sleeves, many=True)
-    data = list(serializer.data)
-    for sleeve in data:
-        contents = sleeve.get('contents', [])
-        hydrate_songs_from_spotify(contents)
-    return Response(data)
+    payload = get_sleeves_payload()
+    etag = payload['etag']
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in {tag.strip() for tag in if_none_match.split(',')}:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(payload['data'], headers={'ETag': etag})
 
 
 @api_view(['GET'])
@@ -450,48 +472,57 @@ def inventory_list(request):
         items = []
 
     serializer = OwnedSongSerializer(items, many=True)
-    data = hydrate_songs_from_spotify(list(serializer.data))
+    data = hydrate_songs_from_spotify(list(serializer.data), background=True)
     return Response(data)
 
 
 @api_view(['POST'])
 def open_sleeve(request, sleeve_id):
+    raw_count = request.data.get('count')
+    batch_mode = raw_count is not None
+    try:
+        count = int(raw_count) if batch_mode else 1
+    except (TypeError, ValueError):
+        return Response({'detail': 'count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if count < 1 or count > MAX_SLEEVE_OPEN_BATCH:
+        return Response({'detail': f'count must be between 1 and {MAX_SLEEVE_OPEN_BATCH}'}, status=status.HTTP_400_BAD_REQUEST)
+
     sleeve = get_object_or_404(Sleeve, pk=sleeve_id)
-    contents = list(SleeveSong.objects.filter(sleeve=sleeve).select_related('song'))
-    if not contents:
+    alias_table = sleeve_alias_table(sleeve)
+    if alias_table is None:
         return Response({'detail': 'Sleeve is empty'}, status=status.HTTP_400_BAD_REQUEST)
 
-    bag = []
-    for item in contents:
-        w = item.weight if item.weight is not None else RARITY_WEIGHT.get(item.rarity, 1)
-        bag.append((item, w))
-
-    total = sum(w for _, w in bag)
-    roll = random.random() * total
-    chosen = bag[-1][0]
-    for item, w in bag:
-        roll -= w
-        if roll <= 0:
-            chosen = item
-            break
+    drawn = alias_table.draw_many(count)
 
     # Require authentication for opening a sleeve.
     if not request.user.is_authenticated:
         return Response({'detail': 'authentication required to open sleeve'}, status=status.HTTP_401_UNAUTHORIZED)
 
-    profile = request.user.profile
-    if profile.wallet < sleeve.cost:
-        return Response({'detail': 'not enough money in wallet'}, status=status.HTTP_400_BAD_REQUEST)
+    songs_by_id = Song.objects.in_bulk({outcome.song_id for outcome in drawn})
+    with transaction.atomic():
+        # Coins and XP move in one conditional UPDATE and one ledger row, never a read-modify-write of the profile.
+        debit = debit_wallet(
+            request.user.id,
+            sleeve.cost * count,
+            reason='sleeve_open',
+            reference=sleeve.id,
+            xp_delta=SLEEVE_OPEN_XP_REWARD * count,
+        )
+        if not debit.ok:
+            return Response({'detail': 'not enough money in wallet'}, status=status.HTTP_400_BAD_REQUEST)
 
-    profile.wallet -= sleeve.cost
-    _grant_profile_xp(profile, SLEEVE_OPEN_XP_REWARD)
-    profile.save(update_fields=['wallet', 'xp', 'level'])
+        owned_songs = OwnedSong.objects.bulk_create([
+            OwnedSong(song=songs_by_id[outcome.song_id], rarity=outcome.rarity, owner=request.user)
+            for outcome in drawn
+        ])
 
-    owned = OwnedSong.objects.create(song=chosen.song, rarity=chosen.rarity, owner=request.user)
-    serializer = OwnedSongSerializer(owned)
-    data = serializer.data
-    hydrate_songs_from_spotify([data])
-    return Response(data, status=status.HTTP_201_CREATED)
+    serializer = OwnedSongSerializer(owned_songs, many=True)
+    data = list(serializer.data)
+    hydrate_songs_from_spotify(data)
+    if batch_mode:
+        return Response(data, status=status.HTTP_201_CREATED)
+    return Response(data[0], status=status.HTTP_201_CREATED)
 
 
 @api_view(['POST'])
@@ -528,9 +559,69 @@ def reroll_inventory_song(request):
     if MarketListing.objects.filter(owned_song_id__in=owned_song_ids, status='active').exists():
         return Response({'detail': 'listed songs cannot be rerolled'}, status=status.HTTP_400_BAD_REQUEST)
 
-    apple_candidates: list[AppleTrackData] = []
-    if artist_keyword:
-        apple_candidates = _progressive_apple_candidates(artist_keyword)
+    # The offline catalog index answers without any provider calls when the artist is in it.
+    apple_candidates, spotify_candidates = catalog_candidates(artist_keyword, artist_id)
+    spotify_client = SpotifyClient()
+    spotify_lookup_failed = False
+    lookup_timed_out = False
+    if not apple_candidates and not spotify_candidates and artist_keyword:
+        def load_apple(deadline, cancelled):
+            return cached_artist_candidates(
+                'apple',
+                artist_keyword,
+                lambda: _progressive_apple_candidates(artist_keyword, deadline=deadline, cancelled=cancelled),
+                refresh_loader=lambda: _progressive_apple_candidates(artist_keyword),
+            )
+
+        def load_spotify(deadline, cancelled):
+            # Intentional simpler fallback: keyword search only (no artist-id lock step).
+            return cached_artist_candidates(
+                'spotify',
+                artist_keyword,
+                lambda: _spotify_keyword_candidates_or_none(
+                    spotify_client,
+                    artist_keyword,
+                    deadline=deadline,
+                    cancelled=cancelled,
+                ),
+                refresh_loader=lambda: _spotify_keyword_candidates_or_none(SpotifyClient(), artist_keyword),
+            )
+
+        race = race_candidate_sources(load_apple, load_spotify if spotify_client.is_configured else None)
+        apple_candidates = race.apple
+        spotify_candidates = race.spotify
+        spotify_lookup_failed = 'spotify' in race.failed
+        lookup_timed_out = race.timed_out
+
+    providers_down = circuit_breaker.is_open(*circuit_breaker.ITUNES_SEARCH) or circuit_breaker.is_open(*circuit_breaker.SPOTIFY_SEARCH)
+    if not apple_candidates and not spotify_candidates and providers_down:
+        # Fall back to songs we already know about for this artist rather than failing the reroll.
+        local_songs = _local_reroll_songs(artist_keyword)
+        if not local_songs:
+            retry_after = max(
+                circuit_breaker.open_seconds_remaining(*circuit_breaker.ITUNES_SEARCH),
+                circuit_breaker.open_seconds_remaining(*circuit_breaker.SPOTIFY_SEARCH),
+                1,
+            )
+            return Response(
+                {'detail': 'music providers are unavailable', 'retryAfterSeconds': retry_after},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        rolled_rarity = _roll_rarity_from_inputs([song.rarity for song in owned_songs])
+        with transaction.atomic():
+            OwnedSong.objects.filter(id__in=owned_song_ids, owner=request.user).delete()
+            rolled_song = OwnedSong.objects.create(song=random.choice(local_songs), rarity=rolled_rarity, owner=request.user)
+
+        serializer = OwnedSongSerializer(rolled_song)
+        payload = serializer.data
+        hydrate_songs_from_spotify([payload])
+        return Response({
+            'newSong': payload,
+            'consumedOwnedSongIds': owned_song_ids,
+            'rolledRarity': rolled_rarity,
+            'provider': 'local',
+        }, status=status.HTTP_201_CREATED)
 
     if apple_candidates:
         chosen_apple_track = random.choice(apple_candidates)
@@ -552,17 +643,6 @@ def reroll_inventory_song(request):
             'provider': 'apple',
         }, status=status.HTTP_201_CREATED)
 
-    spotify_client = SpotifyClient()
-    spotify_candidates = []
-    spotify_lookup_failed = False
-    if spotify_client.is_configured and artist_keyword:
-        try:
-            # Intentional simpler fallback: keyword search only (no artist-id lock step).
-            spotify_candidates = _progressive_spotify_keyword_candidates(spotify_client, artist_keyword)
-        except Exception:
-            spotify_lookup_failed = True
-            spotify_candidates = []
-
     if not spotify_candidates:
         if spotify_client.last_error_code == 429:
             payload = {'detail': 'spotify rate limited'}
@@ -573,6 +653,8 @@ def reroll_inventory_song(request):
             return Response({'detail': 'spotify access forbidden for search'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         if spotify_lookup_failed:
             return Response({'detail': 'spotify lookup failed and no Apple tracks found'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if lookup_timed_out:
+            return Response({'detail': 'artist lookup timed out'}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         return Response({'detail': 'no Apple or Spotify tracks found for this artist keyword'}, status=status.HTTP_404_NOT_FOUND)
 
     chosen_track = random.choice(spotify_candidates)
@@ -619,6 +701,11 @@ def spotify_artist_search(request):
             return Response(payload, status=status.HTTP_429_TOO_MANY_REQUESTS)
         if spotify_client.last_error_code == 403:
             return Response({'detail': 'spotify access forbidden for search'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if spotify_client.last_error_code == CIRCUIT_OPEN_ERROR_CODE:
+            return Response({
+                'detail': 'spotify search is temporarily unavailable',
+                'retryAfterSeconds': spotify_client.last_retry_after_seconds,
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     return Response({
         'artists': [
@@ -965,10 +1052,11 @@ def auth_login(request):
     if profile is not None:
         if profile.last_daily_bonus_claimed_at != today:
             daily_bonus = _daily_login_bonus_for_level(profile.level or 1)
-            profile.wallet = (profile.wallet or 0) + daily_bonus
-            profile.last_daily_bonus_claimed_at = today
-            profile.save(update_fields=['wallet', 'last_daily_bonus_claimed_at'])
-            wallet_increase = daily_bonus
+            claim = claim_daily_bonus(user.id, daily_bonus, today)
+            if claim.ok:
+                profile.wallet = claim.balance
+                profile.last_daily_bonus_claimed_at = today
+                wallet_increase = daily_bonus
 
     return Response({'user': serializer.data, 'walletIncrease': wallet_increase})
 
@@ -997,8 +1085,8 @@ def auth_add_test_gold(request):
     if profile is None:
         return Response({'detail': 'profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    profile.wallet = (profile.wallet or 0) + 100
-    profile.save(update_fields=['wallet'])
+    credit = credit_wallet(request.user.id, 100, reason='test_gold')
+    profile.wallet = credit.balance
 
     serializer = UserSerializer(request.user)
     return Response({'user': serializer.data})
@@ -1015,7 +1103,7 @@ def market_listings(request):
     )
     serializer = MarketListingSerializer(listings, many=True)
     data = list(serializer.data)
-    hydrate_songs_from_spotify(data)
+    hydrate_songs_from_spotify(data, background=True)
     return Response(data)
 
 
@@ -1061,7 +1149,6 @@ def market_buy_listing(request, listing_id):
     with transaction.atomic():
         listing = (
             MarketListing.objects
-            .select_for_update()
             .select_related('owned_song', 'seller__profile')
             .filter(id=listing_id)
             .first()
@@ -1072,25 +1159,29 @@ def market_buy_listing(request, listing_id):
         if listing.seller_id == request.user.id:
             return Response({'detail': 'cannot buy your own listing'}, status=status.HTTP_400_BAD_REQUEST)
 
-        buyer_profile = request.user.profile
-        seller_profile = listing.seller.profile
+        sold_at = timezone.now()
+        # Claiming the listing is itself the guard: only one buyer can flip it from active.
+        claimed = (
+            MarketListing.objects
+            .filter(id=listing.id, status='active')
+            .update(status='sold', buyer=request.user, sold_at=sold_at)
+        )
+        if not claimed:
+            return Response({'detail': 'listing is not available'}, status=status.HTTP_404_NOT_FOUND)
 
-        if buyer_profile.wallet < listing.price:
+        reference = f"listing:{listing.id}"
+        debit = debit_wallet(request.user.id, listing.price, reason='market_purchase', reference=reference)
+        if not debit.ok:
+            transaction.set_rollback(True)
             return Response({'detail': 'not enough money in wallet'}, status=status.HTTP_400_BAD_REQUEST)
 
-        buyer_profile.wallet -= listing.price
-        seller_profile.wallet += listing.price
-        buyer_profile.save(update_fields=['wallet'])
-        seller_profile.save(update_fields=['wallet'])
-
-        owned_song = listing.owned_song
-        owned_song.owner = request.user
-        owned_song.save(update_fields=['owner'])
+        credit_wallet(listing.seller_id, listing.price, reason='market_sale', reference=reference)
+        OwnedSong.objects.filter(id=listing.owned_song_id).update(owner=request.user)
 
+        listing.owned_song.owner = request.user
         listing.status = 'sold'
         listing.buyer = request.user
-        listing.sold_at = timezone.now()
-        listing.save(update_fields=['status', 'buyer', 'sold_at'])
+        listing.sold_at = sold_at
 
     serializer = MarketListingSerializer(listing)
     data = serializer.data
@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from datetime import date
+
+from django.db.models import F
+
+from .ledger import record_entry
+from .leveling import level_from_total_xp, total_xp_for
+from .models import Profile
+
+
+@dataclass(frozen=True)
+class WalletChange:
+    ok: bool
+    balance: int | None
+
+
+def _wallet_balance(user_id: int) -> int | None:
+    return Profile.objects.filter(user_id=user_id).values_list('wallet', flat=True).first()
+
+
+def debit_wallet(user_id: int, amount: int, *, reason: str, reference: str = '', xp_delta: int = 0) -> WalletChange:
+    """Take coins in a single conditional UPDATE so concurrent debits can never overdraw."""
+    if xp_delta > 0:
+        return _debit_wallet_with_xp(user_id, amount, xp_delta, reason=reason, reference=reference)
+    debited = (
+        Profile.objects
+        .filter(user_id=user_id, wallet__gte=amount)
+        .update(wallet=F('wallet') - amount)
+    )
+    if debited:
+        record_entry(user_id, reason, wallet_delta=-amount, reference=reference)
+    return WalletChange(ok=bool(debited), balance=_wallet_balance(user_id))
+
+
+def _debit_wallet_with_xp(user_id: int, amount: int, xp_delta: int, *, reason: str, reference: str) -> WalletChange:
+    """
+    Debit and grant XP in the same UPDATE, guarded on the xp/level it was computed from.
+    Level is not expressible with F(), so a concurrent grant makes the guard miss and the
+    new values are recomputed from a fresh read; a miss always means someone else's write landed.
+    """
+    while True:
+        row = Profile.objects.filter(user_id=user_id).values_list('wallet', 'xp', 'level').first()
+        if row is None or row[0] < amount:
+            return WalletChange(ok=False, balance=row[0] if row else None)
+        _, xp, level = row
+        new_level, new_xp = level_from_total_xp(total_xp_for(level, xp) + xp_delta)
+        updated = (
+            Profile.objects
+            .filter(user_id=user_id, wallet__gte=amount, xp=xp, level=level)
+            .update(wallet=F('wallet') - amount, xp=new_xp, level=new_level)
+        )
+        if updated:
+            record_entry(user_id, reason, wallet_delta=-amount, xp_delta=xp_delta, reference=reference)
+            return WalletChange(ok=True, balance=_wallet_balance(user_id))
+
+
+def credit_wallet(user_id: int, amount: int, *, reason: str, reference: str = '') -> WalletChange:
+    credited = Profile.objects.filter(user_id=user_id).update(wallet=F('wallet') + amount)
+    if credited:
+        record_entry(user_id, reason, wallet_delta=amount, reference=reference)
+    return WalletChange(ok=bool(credited), balance=_wallet_balance(user_id))
+
+
+def claim_daily_bonus(user_id: int, amount: int, today: date) -> WalletChange:
+    """Credit the daily bonus at most once per day; the claim date is the UPDATE guard."""
+    claimed = (
+        Profile.objects
+        .filter(user_id=user_id)
+        .exclude(last_daily_bonus_claimed_at=today)
+        .update(wallet=F('wallet') + amount, last_daily_bonus_claimed_at=today)
+    )
+    if claimed:
+        record_entry(user_id, 'daily_bonus', wallet_delta=amount, reference=today.isoformat())
+    return WalletChange(ok=bool(claimed), balance=_wallet_balance(user_id))
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the title/artist matchers against the per-call implementations they replaced.
+
+Builds random candidate lists (200 by default), checks that api.matching picks exactly
+what the old loops picked for every query, then times both. Only the reroll catalog is
+compiled: "cold" includes compiling it, "warm" reuses the index as repeat rerolls do.
+iTunes answers and locked-artist filters are scored once each, so they are timed directly.
+
+Usage (from the `server` directory):
+  python benchmark_matching.py
+  python benchmark_matching.py --candidates 200 --queries 2000 --seed 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+from api.matching import (
+    artist_key_positions,
+    best_catalog_match,
+    best_genre_match,
+    best_preview_match,
+    compile_tracks,
+    normalize_artist_text,
+)
+
+WORDS = (
+    "love night heart fire dance girl baby dream light summer city blue gold wild rain "
+    "home road time star moon young forever money again alone tonight electric sweet"
+).split()
+ARTIST_WORDS = "the black lil big young dj kid midnight velvet neon echo crystal north".split()
+GENRES = ("Pop", "Rock", "Hip-Hop/Rap", "R&B/Soul", "Dance", "Alternative", "Country")
+
+
+# --- The implementations api.matching replaced, kept verbatim as the reference. ---
+
+def _artist_tokens(artist: str) -> list[str]:
+    return [
+        token.strip()
+        for token in re.split(r",|&| feat\.?| featuring ", (artist or "").strip(), flags=re.IGNORECASE)
+        if token.strip()
+    ]
+
+
+def legacy_catalog_match(title, artist, catalog):
+    wanted_title = (title or "").strip().casefold()
+    wanted_artist = (artist or "").strip().casefold()
+    if not wanted_title or not catalog:
+        return None
+
+    best_index = None
+    best_score = -1
+    for index, track in enumerate(catalog):
+        title_score = 0
+        track_title = (track.title or "").strip().casefold()
+        track_artist = (track.artist or "").strip().casefold()
+
+        if track_title == wanted_title:
+            title_score = 6
+        elif wanted_title in track_title or track_title in wanted_title:
+            title_score = 4
+        elif wanted_title and track_title:
+            wanted_tokens = {token for token in re.split(r"\W+", wanted_title) if token}
+            track_tokens = {token for token in re.split(r"\W+", track_title) if token}
+            overlap = len(wanted_tokens & track_tokens)
+            if overlap >= 2:
+                title_score = 2
+
+        if title_score == 0:
+            continue
+
+        score = title_score
+
+        if wanted_artist and track_artist == wanted_artist:
+            score += 4
+        elif wanted_artist and (wanted_artist in track_artist or track_artist in wanted_artist):
+            score += 2
+
+        if score > best_score:
+            best_score = score
+            best_index = index
+
+    return best_index if best_score > 0 else None
+
+
+def legacy_genre_match(title, artist, candidates):
+    wanted_title = (title or "").strip().casefold()
+    artist_tokens = [token.casefold() for token in _artist_tokens((artist or "").strip())]
+    best_score = -1
+    best_genre = None
+    for item in candidates:
+        genre_name = (item.get("primaryGenreName") or "").strip()
+        if not genre_name:
+            continue
+
+        score = 0
+        track_name = str(item.get("trackName", "")).casefold()
+        artist_name = str(item.get("artistName", "")).casefold()
+
+        if track_name == wanted_title:
+            score += 5
+        elif wanted_title and wanted_title in track_name:
+            score += 2
+
+        matched_artist = False
+        for token in artist_tokens:
+            if artist_name == token:
+                score += 4
+                matched_artist = True
+            elif token in artist_name:
+                score += 2
+                matched_artist = True
+
+        if artist_tokens and not matched_artist:
+            continue
+
+        if score > best_score:
+            best_score = score
+            best_genre = genre_name
+    return best_genre
+
+
+def legacy_preview_match(title, artist, candidates):
+    wanted_title = (title or "").strip().casefold()
+    wanted_artist = (artist or "").strip().casefold()
+    best_score = -1
+    best_preview_url = None
+    for item in candidates:
+        preview_url = item.get("previewUrl")
+        if not preview_url:
+            continue
+
+        score = 0
+        track_name = str(item.get("trackName", "")).casefold()
+        artist_name = str(item.get("artistName", "")).casefold()
+
+        if track_name == wanted_title:
+            score += 4
+        elif wanted_title and wanted_title in track_name:
+            score += 2
+
+        if wanted_artist and artist_name == wanted_artist:
+            score += 4
+        elif wanted_artist and wanted_artist in artist_name:
+            score += 2
+
+        if score > best_score:
+            best_score = score
+            best_preview_url = preview_url
+    return best_preview_url
+
+
+def legacy_artist_filter(keyword, tracks):
+    normalized_keyword = normalize_artist_text(keyword)
+    return [
+        position
+        for position, track in enumerate(tracks)
+        if normalized_keyword and normalized_keyword in normalize_artist_text(track.artist)
+    ]
+
+
+# --- Synthetic data ---
+
+def _random_title(rng: random.Random) -> str:
+    words = rng.sample(WORDS, rng.randint(1, 4))
+    title = " ".join(words).title()
+    if rng.random() < 0.15:
+        title += f" ({rng.choice(['Remix', 'Live', 'Acoustic', 'feat. ' + rng.choice(ARTIST_WORDS).title()])})"
+    return title
+
+
+def _random_artist(rng: random.Random) -> str:
+    name = " ".join(rng.sample(ARTIST_WORDS, rng.randint(1, 2))).title()
+    if rng.random() < 0.2:
+        name += f" & {rng.choice(ARTIST_WORDS).title()}"
+    return name
+
+
+def build_tracks(rng: random.Random, count: int) -> list:
+    return [SimpleNamespace(title=_random_title(rng), artist=_random_artist(rng)) for _ in range(count)]
+
+
+def build_itunes_results(tracks: list, rng: random.Random) -> list[dict]:
+    results = []
+    for position, track in enumerate(tracks):
+        item = {"trackId": position, "trackName": track.title, "artistName": track.artist}
+        if rng.random() < 0.9:
+            item["primaryGenreName"] = rng.choice(GENRES)
+        if rng.random() < 0.8:
+            item["previewUrl"] = f"https://audio.example/{position}.m4a"
+        results.append(item)
+    return results
+
+
+def build_queries(rng: random.Random, tracks: list, count: int) -> list[tuple[str, str]]:
+    queries = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.3:
+            track = rng.choice(tracks)
+            queries.append((track.title, track.artist))
+        elif roll < 0.5:
+            track = rng.choice(tracks)
+            queries.append((track.title.split(" (")[0].upper(), rng.choice([track.artist, ""])))
+        elif roll < 0.7:
+            track = rng.choice(tracks)
+            words = track.title.split()
+            queries.append((" ".join(words[: max(1, len(words) - 1)]), _random_artist(rng)))
+        else:
+            queries.append((_random_title(rng), _random_artist(rng)))
+    return queries
+
+
+# --- Runner ---
+
+def _time(label: str, runs: int, fn: Callable[[], None]) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    per_call_us = elapsed / runs * 1_000_000
+    print(f"  {label:<28} {per_call_us:9.1f} us/query")
+    return per_call_us
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    tracks = build_tracks(rng, args.candidates)
+    results = build_itunes_results(tracks, rng)
+    queries = build_queries(rng, tracks, args.queries)
+    keywords = [rng.choice(ARTIST_WORDS) for _ in range(args.queries)]
+
+    catalog_index = compile_tracks(tracks)
+
+    def genre_args(title, artist):
+        return title.strip().casefold(), [token.casefold() for token in _artist_tokens(artist.strip())]
+
+    mismatches = 0
+    for (title, artist), keyword in zip(queries, keywords):
+        mismatches += legacy_catalog_match(title, artist, tracks) != best_catalog_match(catalog_index, title, artist)
+        mismatches += legacy_genre_match(title, artist, results) != best_genre_match(results, *genre_args(title, artist))
+        mismatches += legacy_preview_match(title, artist, results) != best_preview_match(
+            results, title.strip().casefold(), artist.strip().casefold()
+        )
+        mismatches += legacy_artist_filter(keyword, tracks) != artist_key_positions(tracks, keyword)
+    if mismatches:
+        print(f"{mismatches} result(s) differ from the reference implementation", file=sys.stderr)
+        return 1
+    print(f"{len(queries)} queries x 4 matchers over {args.candidates} candidates: identical results")
+
+    runs = len(queries)
+    print("catalog (reroll):")
+    before = _time("per-call normalization", runs, lambda: [legacy_catalog_match(t, a, tracks) for t, a in queries])
+    cold = _time("compiled, cold", runs, lambda: [best_catalog_match(compile_tracks(tracks), t, a) for t, a in queries])
+    warm = _time("compiled, warm", runs, lambda: [best_catalog_match(catalog_index, t, a) for t, a in queries])
+    print(f"  {'speedup (cold / warm)':<28} {before / cold:6.1f}x / {before / warm:.1f}x")
+
+    direct = {
+        "genre": (
+            lambda: [legacy_genre_match(t, a, results) for t, a in queries],
+            lambda: [best_genre_match(results, *genre_args(t, a)) for t, a in queries],
+        ),
+        "preview": (
+            lambda: [legacy_preview_match(t, a, results) for t, a in queries],
+            lambda: [best_preview_match(results, t.casefold(), a.casefold()) for t, a in queries],
+        ),
+        "locked-artist filter": (
+            lambda: [legacy_artist_filter(k, tracks) for k in keywords],
+            lambda: [artist_key_positions(tracks, k) for k in keywords],
+        ),
+    }
+    for name, (legacy, current) in direct.items():
+        print(f"{name}:")
+        before = _time("previous loop", runs, legacy)
+        after = _time("api.matching", runs, current)
+        print(f"  {'speedup':<28} {before / after:9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,6 +21,7 @@ def main():
     from django.contrib.auth import get_user_model
     User = get_user_model()
     from api.models import Profile
+    from api.wallet import credit_wallet
 
     print('Create a new user')
     username = input('username: ').strip()
@@ -56,9 +57,11 @@ def main():
         print('Created profile')
     else:
         profile.display_name = display_name
-        profile.wallet = wallet
         profile.avatar_url = avatar_url
-        profile.save()
+        profile.save(update_fields=['display_name', 'avatar_url'])
+        # Wallet changes go through the ledger so rebuild_ledger_balances keeps them.
+        if profile.wallet != wallet:
+            credit_wallet(user.id, wallet - profile.wallet, reason='adjustment', reference='create_user_cli')
         print('Updated profile')
 
     print('Done. User: ', user.username)
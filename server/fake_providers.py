@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Spotify Web API and iTunes Search endpoints Muscino calls.
+
+Serves recorded fixtures when one matches the request and deterministic synthetic
+responses otherwise, with optional latency, error rates, 429s and a throughput cap,
+so the backend and refresh scripts can be benchmarked offline without spending quota.
+
+Usage (from the `server` directory):
+  python fake_providers.py --port 8765 --latency-ms 80 --jitter-ms 40 --max-rps 20
+  python fake_providers.py --fixtures provider_fixtures.json --error-rate 0.02 --throttle-rate 0.05
+
+Then point the backend at it:
+  SPOTIFY_API_BASE=http://127.0.0.1:8765/v1 \
+  SPOTIFY_AUTH_URL=http://127.0.0.1:8765/api/token \
+  ITUNES_SEARCH_URL=http://127.0.0.1:8765/search \
+  SPOTIFY_CLIENT_ID=fake SPOTIFY_CLIENT_SECRET=fake \
+  python manage.py runserver
+
+Fixtures are a JSON object keyed by "METHOD /path?query" with the query parameters
+sorted, e.g. "GET /v1/tracks?ids=abc". A value is either a response body or
+{"status": 404, "headers": {...}, "body": {...}}.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib import parse
+
+GENRES = ("Pop", "Rock", "Hip-Hop/Rap", "R&B/Soul", "Electronic", "Alternative", "Country", "Latin", "Jazz", "Classical")
+TITLE_WORDS = (
+    "Midnight", "Neon", "Golden", "Echo", "River", "Static", "Velvet", "Paper", "Satellite", "Summer",
+    "Ghost", "Electric", "Honey", "Glass", "Wild", "Silver", "Lights", "Heart", "Runaway", "Signal",
+)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def _number(*parts: Any) -> int:
+    return int(_digest(*parts)[:12], 16)
+
+
+def _title(*parts: Any) -> str:
+    n = _number("title", *parts)
+    return f"{TITLE_WORDS[n % len(TITLE_WORDS)]} {TITLE_WORDS[(n // 7) % len(TITLE_WORDS)]}"
+
+
+def _artist_from_query(query: str) -> str:
+    match = re.search(r'artist:"?([^"]+)"?', query)
+    name = (match.group(1) if match else query).strip()
+    return name or "Unknown Artist"
+
+
+class SyntheticCatalog:
+    """Deterministic fake catalog: the same ids and queries always produce the same payloads."""
+
+    def spotify_artist(self, artist_id: str, name: str | None = None) -> dict[str, Any]:
+        return {
+            "id": artist_id,
+            "name": name or f"Artist {artist_id[:6]}",
+            "genres": [GENRES[_number("genre", artist_id) % len(GENRES)].lower()],
+            "popularity": _number("artist-popularity", artist_id) % 101,
+            "images": [{"url": f"https://fake.local/artist/{artist_id}.jpg", "width": 640, "height": 640}],
+            "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        }
+
+    def spotify_track(self, track_id: str, artist_name: str | None = None) -> dict[str, Any]:
+        artist_name = artist_name or f"Artist {_digest('artist', track_id)[:6]}"
+        artist_id = _digest("artist-id", artist_name.casefold())[:22]
+        days_old = _number("release", track_id) % 3000
+        release = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days_old * 86400))
+        return {
+            "id": track_id,
+            "name": _title(track_id),
+            "popularity": _number("popularity", track_id) % 101,
+            "artists": [{"id": artist_id, "name": artist_name}],
+            "album": {
+                "id": _digest("album", track_id)[:22],
+                "release_date": release,
+                "images": [{"url": f"https://fake.local/cover/{track_id}.jpg", "width": 640, "height": 640}],
+            },
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        }
+
+    def spotify_tracks(self, ids: list[str], missing_rate: float) -> dict[str, Any]:
+        tracks = []
+        for track_id in ids:
+            # A stable slice of ids behaves like deleted or region-locked tracks.
+            if missing_rate and (_number("missing", track_id) % 10_000) / 10_000 < missing_rate:
+                tracks.append(None)
+            else:
+                tracks.append(self.spotify_track(track_id))
+        return {"tracks": tracks}
+
+    def spotify_search(self, query: str, search_type: str, limit: int, offset: int) -> dict[str, Any]:
+        total = 200
+        indices = range(offset, min(offset + limit, total))
+        if search_type == "artist":
+            items = [
+                self.spotify_artist(_digest("search-artist", query.casefold(), i)[:22], f"{query.strip().title()} {i}" if i else query.strip())
+                for i in indices
+            ]
+            return {"artists": {"items": items, "total": total, "limit": limit, "offset": offset}}
+        artist_name = _artist_from_query(query)
+        items = [self.spotify_track(_digest("search-track", query.casefold(), i)[:22], artist_name) for i in indices]
+        return {"tracks": {"items": items, "total": total, "limit": limit, "offset": offset}}
+
+    def spotify_top_tracks(self, artist_id: str) -> dict[str, Any]:
+        name = f"Artist {artist_id[:6]}"
+        return {"tracks": [self.spotify_track(_digest("top", artist_id, i)[:22], name) for i in range(10)]}
+
+    def spotify_artist_albums(self, artist_id: str, limit: int, offset: int) -> dict[str, Any]:
+        total = 8 + _number("album-count", artist_id) % 40
+        items = [
+            {"id": _digest("artist-album", artist_id, i)[:22], "name": _title("album", artist_id, i), "album_group": "album"}
+            for i in range(offset, min(offset + limit, total))
+        ]
+        return {"items": items, "total": total, "limit": limit, "offset": offset}
+
+    def spotify_album_tracks(self, album_id: str, limit: int) -> dict[str, Any]:
+        count = min(limit, 4 + _number("album-size", album_id) % 12)
+        items = [{"id": _digest("album-track", album_id, i)[:22], "name": _title(album_id, i)} for i in range(count)]
+        return {"items": items, "total": count, "limit": limit, "offset": 0}
+
+    def itunes_search(self, term: str, limit: int) -> dict[str, Any]:
+        # Echo the term back as the artist (and as the first title) so title/artist matching finds a hit.
+        artist_name = term.strip() or "Unknown Artist"
+        results = []
+        for i in range(limit):
+            track_id = _number("itunes", term.casefold(), i) % 2_000_000_000
+            results.append({
+                "wrapperType": "track",
+                "kind": "song",
+                "trackId": track_id,
+                "trackName": term.strip() if i == 0 and term.strip() else _title("itunes", term, i),
+                "artistName": artist_name,
+                "collectionName": _title("collection", term, i // 10),
+                "artworkUrl100": f"https://fake.local/itunes/{track_id}/100x100bb.jpg",
+                "previewUrl": f"https://fake.local/itunes/{track_id}/preview.m4a",
+                "trackViewUrl": f"https://music.apple.com/us/song/{track_id}",
+                "primaryGenreName": GENRES[_number("itunes-genre", term.casefold()) % len(GENRES)],
+            })
+        return {"resultCount": len(results), "results": results}
+
+
+class ThroughputCap:
+    """Token bucket shared by every handler thread; requests over the cap get a 429."""
+
+    def __init__(self, max_rps: float, burst: int) -> None:
+        self.max_rps = max_rps
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Return 0 when the request may go ahead, otherwise seconds until a token is available."""
+        if self.max_rps <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.max_rps)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.max_rps
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], options: argparse.Namespace, fixtures: dict[str, Any]) -> None:
+        super().__init__(address, FakeProviderHandler)
+        self.options = options
+        self.fixtures = fixtures
+        self.catalog = SyntheticCatalog()
+        self.cap = ThroughputCap(options.max_rps, options.burst or max(1, int(options.max_rps)))
+        self.random = random.Random(options.seed)
+        self.random_lock = threading.Lock()
+        self.stats: dict[str, int] = {}
+        self.stats_lock = threading.Lock()
+
+    def roll(self) -> float:
+        with self.random_lock:
+            return self.random.random()
+
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    server: FakeProviderServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._handle("POST")
+
+    def _send(self, status: int, body: Any, headers: dict[str, str] | None = None) -> None:
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+        self.server.count(str(status))
+
+    def _handle(self, method: str) -> None:
+        options = self.server.options
+        url = parse.urlsplit(self.path)
+        query = dict(parse.parse_qsl(url.query, keep_blank_values=True))
+        self.server.count("requests")
+
+        wait = self.server.cap.take()
+        if wait > 0:
+            self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}}, {"Retry-After": str(max(1, round(wait)))})
+            return
+
+        delay = options.latency_ms + (self.server.roll() * options.jitter_ms if options.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if url.path != "/api/token":
+            if options.throttle_rate and self.server.roll() < options.throttle_rate:
+                self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}}, {"Retry-After": str(options.retry_after)})
+                return
+            if options.error_rate and self.server.roll() < options.error_rate:
+                self._send(503, {"error": {"status": 503, "message": "Service unavailable"}})
+                return
+
+        fixture_key = f"{method} {url.path}?{parse.urlencode(sorted(query.items()))}".rstrip("?")
+        fixture = self.server.fixtures.get(fixture_key)
+        if fixture is not None:
+            self.server.count("fixture")
+            if isinstance(fixture, dict) and "body" in fixture:
+                self._send(int(fixture.get("status", 200)), fixture["body"], fixture.get("headers"))
+            else:
+                self._send(200, fixture)
+            return
+
+        body = self._synthetic(method, url.path, query)
+        if body is None:
+            self._send(404, {"error": {"status": 404, "message": f"no fake for {method} {url.path}"}})
+            return
+        self._send(200, body)
+
+    def _synthetic(self, method: str, path: str, query: dict[str, str]) -> Any:
+        catalog = self.server.catalog
+        limit = int(query.get("limit") or 20)
+        offset = int(query.get("offset") or 0)
+
+        if method == "POST" and path == "/api/token":
+            return {"access_token": f"fake-{_digest(time.time())[:16]}", "token_type": "Bearer", "expires_in": 3600}
+        if method != "GET":
+            return None
+        if path == "/search":
+            return catalog.itunes_search(query.get("term", ""), min(limit, 200))
+        if path == "/v1/tracks":
+            ids = [track_id for track_id in query.get("ids", "").split(",") if track_id][:50]
+            return catalog.spotify_tracks(ids, self.server.options.missing_rate)
+        if path == "/v1/search":
+            return catalog.spotify_search(query.get("q", ""), query.get("type", "track"), min(limit, 50), offset)
+
+        match = re.fullmatch(r"/v1/artists/([^/]+)/(top-tracks|albums)", path)
+        if match:
+            artist_id = parse.unquote(match.group(1))
+            if match.group(2) == "top-tracks":
+                return catalog.spotify_top_tracks(artist_id)
+            return catalog.spotify_artist_albums(artist_id, min(limit, 50), offset)
+        match = re.fullmatch(r"/v1/albums/([^/]+)/tracks", path)
+        if match:
+            return catalog.spotify_album_tracks(parse.unquote(match.group(1)), min(limit, 50))
+        return None
+
+
+def load_fixtures(path: str | None) -> dict[str, Any]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        fixtures = json.load(handle)
+    if not isinstance(fixtures, dict):
+        raise SystemExit(f"{path}: fixtures must be a JSON object keyed by 'METHOD /path?query'")
+    return fixtures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Spotify Web API + iTunes Search server for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="JSON file of recorded responses keyed by 'METHOD /path?query'")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra uniformly random delay on top of --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=int, default=2, help="Retry-After seconds sent with --throttle-rate 429s")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Throughput cap across all endpoints (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=0, help="Bucket size for --max-rps (default: one second of traffic)")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="Fraction of Spotify track ids that come back as null")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the latency/error dice")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    options = parser.parse_args()
+
+    server = FakeProviderServer((options.host, options.port), options, load_fixtures(options.fixtures))
+    base = f"http://{options.host}:{server.server_address[1]}"
+    print(f"Fake providers listening on {base}")
+    print(f"  SPOTIFY_API_BASE={base}/v1")
+    print(f"  SPOTIFY_AUTH_URL={base}/api/token")
+    print(f"  ITUNES_SEARCH_URL={base}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Served:", ", ".join(f"{key}={value}" for key, value in sorted(server.stats.items())))
+
+
+if __name__ == "__main__":
+    main()
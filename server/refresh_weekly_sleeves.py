@@ -9,7 +9,8 @@ Product rules for each generated sleeve:
 - 3 Uncommon
 - 4 Common
 
-This script intentionally updates only Song/Sleeve/SleeveSong data.
+This script intentionally updates only Song/Sleeve/SleeveSong data (plus its own
+run checkpoints, so an interrupted run can be resumed with --resume).
 It does not delete OwnedSong, User, or Profile rows.
 """
 
@@ -22,31 +23,46 @@ import json
 import os
 import re
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from datetime import date, datetime, timedelta
 from typing import Any
 from urllib import error, parse, request
 
 import django
-from django.db import transaction
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 django.setup()
 
-from api.models import Song, Sleeve, SleeveSong  # noqa: E402
-
-SPOTIFY_AUTH_URL = "https://accounts.spotify.com/api/token"
-SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+from api import http_transport, rate_limit  # noqa: E402
+from api.models import (  # noqa: E402
+    REFRESH_STAGE_CHOICES,
+    Sleeve,
+    SleeveRefreshCheckpoint,
+    SleeveRefreshRun,
+    SleeveSong,
+    SleeveVersion,
+    Song,
+)
+from api.sleeve_catalog import refresh_sleeves_payload  # noqa: E402
+from api.sleeve_versions import SleeveEntry, build_sleeve_version, publish_sleeve_version  # noqa: E402
+
+SPOTIFY_AUTH_URL = os.environ.get("SPOTIFY_AUTH_URL", "https://accounts.spotify.com/api/token")
+SPOTIFY_API_BASE = os.environ.get("SPOTIFY_API_BASE", "https://api.spotify.com/v1").rstrip("/")
 MAX_SPOTIFY_RETRIES = 3
 MAX_SPOTIFY_RETRY_AFTER_SECONDS = int(os.environ.get("SPOTIFY_MAX_RETRY_AFTER_SECONDS", "20"))
 MAX_SEED_ARTISTS_PER_GENRE = int(os.environ.get("SPOTIFY_WEEKLY_MAX_SEED_ARTISTS", "12"))
-SPOTIFY_MIN_REQUEST_INTERVAL_SECONDS = float(os.environ.get("SPOTIFY_MIN_REQUEST_INTERVAL_SECONDS", "0.80"))
 SPOTIFY_ARTIST_QUERY_DELAY_SECONDS = float(os.environ.get("SPOTIFY_ARTIST_QUERY_DELAY_SECONDS", "0.30"))
 MAX_REMOTE_SEARCH_CALLS_PER_GENRE = int(os.environ.get("SPOTIFY_WEEKLY_MAX_SEARCH_CALLS_PER_GENRE", "60"))
 SEED_ARTIST_QUERIES_PER_ARTIST = int(os.environ.get("SPOTIFY_WEEKLY_SEED_ARTIST_QUERIES_PER_ARTIST", "2"))
 RECENT_RELEASE_QUERY_COUNT = int(os.environ.get("SPOTIFY_WEEKLY_RECENT_RELEASE_QUERY_COUNT", "3"))
 TARGET_ARTISTS_PER_GENRE = int(os.environ.get("SPOTIFY_WEEKLY_TARGET_ARTISTS_PER_GENRE", "20"))
 MAX_TRACKS_PER_SELECTED_ARTIST = int(os.environ.get("SPOTIFY_WEEKLY_MAX_TRACKS_PER_SELECTED_ARTIST", "5"))
+# Genres whose candidates are fetched at the same time. Requests stay paced by the shared Spotify rate limit.
+GENRE_REFRESH_CONCURRENCY = int(os.environ.get("SPOTIFY_WEEKLY_GENRE_CONCURRENCY", "4"))
 
 TARGET_DISTRIBUTION: dict[str, int] = {
     "Legendary": 1,
@@ -56,7 +72,7 @@ TARGET_DISTRIBUTION: dict[str, int] = {
     "Common": 4,
 }
 TOTAL_SLEEVE_SIZE = sum(TARGET_DISTRIBUTION.values())
-_LAST_SPOTIFY_REQUEST_TS = 0.0
+REFRESH_STAGES = [stage for stage, _ in REFRESH_STAGE_CHOICES]
 
 LOCAL_NOTABLE_CATALOG: dict[str, list[dict[str, str | None]]] = {
     "Pop": [
@@ -315,12 +331,14 @@ def _fallback_popularity(track_id: str) -> int:
     return int(35 + 45 * _stable_jitter(track_id))
 
 
-def _pace_spotify_requests() -> None:
-    global _LAST_SPOTIFY_REQUEST_TS
-    elapsed = time.monotonic() - _LAST_SPOTIFY_REQUEST_TS
-    if elapsed < SPOTIFY_MIN_REQUEST_INTERVAL_SECONDS:
-        time.sleep(SPOTIFY_MIN_REQUEST_INTERVAL_SECONDS - elapsed)
-    _LAST_SPOTIFY_REQUEST_TS = time.monotonic()
+def _pace_spotify_requests(endpoint: str = "api") -> None:
+    # Shares the cross-worker Spotify budget with the web app, in the batch lane so user requests go first.
+    while True:
+        wait = rate_limit.acquire("spotify", endpoint, rate_limit.LANE_BATCH)
+        if wait <= 0:
+            return
+        print(f"Spotify request budget exhausted; waiting {wait:.1f}s")
+        time.sleep(wait)
 
 
 def spotify_token(client_id: str, client_secret: str) -> str:
@@ -338,8 +356,8 @@ def spotify_token(client_id: str, client_secret: str) -> str:
         method="POST",
     )
 
-    _pace_spotify_requests()
-    with request.urlopen(req, timeout=20) as response:
+    _pace_spotify_requests("auth")
+    with http_transport.urlopen(req, timeout=20) as response:
         data = json.load(response)
     return data["access_token"]
 
@@ -353,7 +371,7 @@ def spotify_get(path: str, token: str, params: dict[str, Any] | None = None) ->
     for attempt in range(MAX_SPOTIFY_RETRIES):
         try:
             _pace_spotify_requests()
-            with request.urlopen(req, timeout=25) as response:
+            with http_transport.urlopen(req, timeout=25) as response:
                 return json.load(response)
         except error.HTTPError as exc:
             if exc.code == 429 and attempt < MAX_SPOTIFY_RETRIES - 1:
@@ -617,7 +635,14 @@ def _local_candidates_for_genre(genre: str, limit: int) -> list[Candidate]:
     return output
 
 
-def fetch_candidates_for_genre(token: str, genre: str, limit: int, market: str) -> list[Candidate]:
+def fetch_candidates_for_genre(
+    token: str,
+    genre: str,
+    limit: int,
+    market: str,
+    *,
+    fallback_to_local: bool = True,
+) -> list[Candidate]:
     by_track_id: dict[str, Candidate] = {}
 
     try:
@@ -655,7 +680,7 @@ def fetch_candidates_for_genre(token: str, genre: str, limit: int, market: str)
             if len(by_track_id) >= max(TOTAL_SLEEVE_SIZE * 3, limit * 2):
                 break
     except error.HTTPError as exc:
-        if exc.code in (403, 429):
+        if exc.code in (403, 429) and fallback_to_local:
             reason = "forbidden" if exc.code == 403 else "rate-limited"
             print(f"Spotify {reason} for genre={genre}; falling back to local catalog candidates.")
             return _local_candidates_for_genre(genre=genre, limit=limit)
@@ -673,7 +698,11 @@ def _recent_artists_for_genre(genre: str, max_sleeves: int = 2) -> set[str]:
         return set()
 
     recent_artists: set[str] = set()
-    for entry in SleeveSong.objects.filter(sleeve__in=sleeves).select_related("song"):
+    active_entries = SleeveSong.objects.filter(
+        sleeve__in=sleeves,
+        version_id=F("sleeve__active_version_id"),
+    ).select_related("song")
+    for entry in active_entries:
         recent_artists.add((entry.song.artist or "").lower().strip())
     return recent_artists
 
@@ -810,7 +839,7 @@ def select_final_sleeve(scored: list[ScoredCandidate]) -> list[tuple[ScoredCandi
     return chosen[:TOTAL_SLEEVE_SIZE]
 
 
-def upsert_sleeve_entries(genre: str, chosen: list[tuple[ScoredCandidate, str]]) -> None:
+def upsert_sleeve_entries(genre: str, chosen: list[tuple[ScoredCandidate, str]]) -> SleeveVersion:
     sleeve = (
         Sleeve.objects.filter(genre__iexact=genre, refreshed_weekly=True).first()
         or Sleeve.objects.filter(genre__iexact=genre).first()
@@ -835,9 +864,8 @@ def upsert_sleeve_entries(genre: str, chosen: list[tuple[ScoredCandidate, str]])
         if update_fields:
             sleeve.save(update_fields=update_fields)
 
-    SleeveSong.objects.filter(sleeve=sleeve).delete()
-
     rarity_counts = {"Legendary": 0, "Epic": 0, "Rare": 0, "Uncommon": 0, "Common": 0}
+    entries: list[SleeveEntry] = []
 
     for item, rarity in chosen:
         c = item.candidate
@@ -853,39 +881,129 @@ def upsert_sleeve_entries(genre: str, chosen: list[tuple[ScoredCandidate, str]])
                 "spotify_url": c.spotify_url,
             },
         )
-        SleeveSong.objects.create(sleeve=sleeve, song=song, rarity=rarity)
+        entries.append(SleeveEntry(song_id=song.id, rarity=rarity))
         rarity_counts[rarity] += 1
 
+    # Build the full new version first; players keep opening the old one until the pointer swap.
+    version = build_sleeve_version(sleeve, entries)
+    publish_sleeve_version(version)
+
     print(
-        f"Updated {sleeve.name}: "
+        f"Updated {sleeve.name} (version {version.number}): "
         f"Legendary={rarity_counts['Legendary']} "
         f"Epic={rarity_counts['Epic']} "
         f"Rare={rarity_counts['Rare']} "
         f"Uncommon={rarity_counts['Uncommon']} "
         f"Common={rarity_counts['Common']}"
     )
+    return version
 
 
-def refresh_genre_sleeve(token: str | None, genre: str, limit: int, market: str, *, local_only: bool = False) -> None:
+def fetch_genre_candidates(
+    token: str | None,
+    genre: str,
+    limit: int,
+    market: str,
+    *,
+    local_only: bool = False,
+    fallback_to_local: bool = True,
+) -> list[Candidate]:
     if local_only:
-        candidates = _local_candidates_for_genre(genre=genre, limit=max(limit, TOTAL_SLEEVE_SIZE))
-    else:
-        if not token:
-            raise RuntimeError("Spotify token is required unless --local-only is used")
-        candidates = fetch_candidates_for_genre(token, genre=genre, limit=limit, market=market)
+        return _local_candidates_for_genre(genre=genre, limit=max(limit, TOTAL_SLEEVE_SIZE))
+    if not token:
+        raise RuntimeError("Spotify token is required unless --local-only is used")
+    return fetch_candidates_for_genre(token, genre=genre, limit=limit, market=market, fallback_to_local=fallback_to_local)
+
 
+def choose_genre_sleeve(genre: str, candidates: list[Candidate]) -> list[tuple[ScoredCandidate, str]]:
+    """Score and pick a genre's sleeve; empty when there are not enough candidates for a full one."""
     if not candidates:
         print(f"No candidates returned for genre={genre}; skipping")
-        return
+        return []
 
     scored = score_candidates(candidates, genre=genre)
     chosen = select_final_sleeve(scored)
 
     if len(chosen) < TOTAL_SLEEVE_SIZE:
         print(f"Not enough candidates for full sleeve in genre={genre}; got={len(chosen)}")
-        return
+        return []
+    return chosen
+
+
+def prepare_genre_sleeve(
+    token: str | None,
+    genre: str,
+    limit: int,
+    market: str,
+    *,
+    local_only: bool = False,
+) -> list[tuple[ScoredCandidate, str]]:
+    """Fetch, score and pick a genre's sleeve. Reads the database but never writes to it."""
+    candidates = fetch_genre_candidates(token, genre=genre, limit=limit, market=market, local_only=local_only)
+    return choose_genre_sleeve(genre, candidates)
+
+
+def publish_genre_sleeve(
+    genre: str,
+    chosen: list[tuple[ScoredCandidate, str]],
+    run: SleeveRefreshRun | None = None,
+) -> SleeveVersion:
+    # One short transaction per genre with no network I/O inside, so live writers only ever wait on this.
+    # The checkpoint is written in the same transaction, so a resumed run never publishes a genre twice.
+    with transaction.atomic():
+        version = upsert_sleeve_entries(genre=genre, chosen=chosen)
+        if run is not None:
+            _save_checkpoint(run, genre, "publish", version=version)
+    return version
+
+
+def refresh_genre_sleeve(token: str | None, genre: str, limit: int, market: str, *, local_only: bool = False) -> None:
+    chosen = prepare_genre_sleeve(token, genre=genre, limit=limit, market=market, local_only=local_only)
+    if chosen:
+        publish_genre_sleeve(genre, chosen)
+        refresh_sleeves_payload()
+
+
+def _candidates_to_json(candidates: list[Candidate]) -> list[dict[str, Any]]:
+    return [asdict(candidate) for candidate in candidates]
+
+
+def _candidates_from_json(data: list[dict[str, Any]] | None) -> list[Candidate]:
+    return [Candidate(**item) for item in data or []]
+
+
+def _chosen_to_json(chosen: list[tuple[ScoredCandidate, str]]) -> list[dict[str, Any]]:
+    return [{"rarity": rarity, "scored": asdict(item)} for item, rarity in chosen]
+
+
+def _chosen_from_json(data: list[dict[str, Any]] | None) -> list[tuple[ScoredCandidate, str]]:
+    chosen = []
+    for entry in data or []:
+        fields = dict(entry["scored"])
+        fields["candidate"] = Candidate(**fields["candidate"])
+        chosen.append((ScoredCandidate(**fields), entry["rarity"]))
+    return chosen
+
 
-    upsert_sleeve_entries(genre=genre, chosen=chosen)
+def _save_checkpoint(run: SleeveRefreshRun, genre: str, stage: str, **fields: Any) -> None:
+    SleeveRefreshCheckpoint.objects.update_or_create(run=run, genre=genre, defaults={"stage": stage, **fields})
+
+
+def _completed_stage(checkpoint: SleeveRefreshCheckpoint | None, from_stage: str | None) -> int:
+    """Index in REFRESH_STAGES of the last stage whose checkpoint can be reused; -1 when none can."""
+    if checkpoint is None:
+        return -1
+    completed = REFRESH_STAGES.index(checkpoint.stage)
+    if from_stage:
+        completed = min(completed, REFRESH_STAGES.index(from_stage) - 1)
+    return completed
+
+
+def _resumable_run(run_id: str) -> SleeveRefreshRun | None:
+    # Without an id only failed runs qualify; a "running" run may still belong to a live process (--daily).
+    if run_id == "latest":
+        return SleeveRefreshRun.objects.filter(status="failed").order_by("-id").first()
+    return SleeveRefreshRun.objects.filter(pk=int(run_id)).first()
 
 
 def _next_daily_run(target_hhmm: str) -> datetime:
@@ -929,16 +1047,113 @@ def refresh_all_genres(
     limit: int,
     market: str,
     local_only: bool,
-    delay_between_genres_seconds: float,
-) -> None:
-    token = _maybe_get_token(local_only=local_only)
+    delay_between_genres_seconds: float = 0.0,
+    concurrency: int = GENRE_REFRESH_CONCURRENCY,
+    run: SleeveRefreshRun | None = None,
+    from_stage: str | None = None,
+) -> SleeveRefreshRun:
+    """
+    Fetch candidates for several genres at once, then score and publish each genre in its own
+    transaction as soon as its candidates are ready. All writes happen on this thread, so the refresh
+    never holds more than one short write lock at a time. A failed genre does not stop the others.
 
-    with transaction.atomic():
-        for i, genre in enumerate(genres):
-            refresh_genre_sleeve(token, genre=genre, limit=limit, market=market, local_only=local_only)
-            if i < len(genres) - 1 and delay_between_genres_seconds > 0:
-                time.sleep(delay_between_genres_seconds)
+    Every genre records a checkpoint after fetch, score and publish. Passing an earlier `run`
+    carries on from those checkpoints (or from `from_stage`, redoing that stage and the ones after)
+    instead of searching Spotify again.
+    """
+    if run is None:
+        run = SleeveRefreshRun.objects.create(genres=genres, limit=limit, market=market, local_only=local_only)
+        print(f"Started sleeve refresh run {run.pk}")
+    else:
+        SleeveRefreshRun.objects.filter(pk=run.pk).update(status="running", finished_at=None)
+        print(f"Resuming sleeve refresh run {run.pk}" + (f" from stage {from_stage}" if from_stage else ""))
+
+    checkpoints = {checkpoint.genre: checkpoint for checkpoint in run.checkpoints.all()}
+    completed = {genre: _completed_stage(checkpoints.get(genre), from_stage) for genre in genres}
+    to_fetch = [genre for genre in genres if completed[genre] < REFRESH_STAGES.index("fetch")]
+    token = _maybe_get_token(local_only=local_only) if to_fetch else None
+    started = time.monotonic()
+
+    def fetch(position: int, genre: str) -> list[Candidate]:
+        stagger = started + position * delay_between_genres_seconds - time.monotonic()
+        if stagger > 0:
+            time.sleep(stagger)
+        try:
+            # No local fallback here: a forbidden or rate-limited genre fails without a fetch checkpoint,
+            # so --resume fetches it from Spotify again instead of keeping a degraded local sleeve.
+            return fetch_genre_candidates(
+                token,
+                genre=genre,
+                limit=limit,
+                market=market,
+                local_only=local_only,
+                fallback_to_local=False,
+            )
+        finally:
+            close_old_connections()
+
+    published: list[str] = []
+
+    def finish(genre: str, fetched: list[Candidate] | None) -> None:
+        # Checkpoints are written here, on the publishing thread, so the workers never hold a write lock.
+        checkpoint = checkpoints.get(genre)
+        done = completed[genre]
+        if done >= REFRESH_STAGES.index("publish"):
+            print(f"Genre={genre} already published in run {run.pk}; skipping")
+            return
+        if done >= REFRESH_STAGES.index("score"):
+            chosen = _chosen_from_json(checkpoint.chosen)
+        else:
+            if fetched is None:
+                candidates = _candidates_from_json(checkpoint.candidates)
+            else:
+                candidates = fetched
+                _save_checkpoint(run, genre, "fetch", candidates=_candidates_to_json(candidates), chosen=None, version=None)
+            chosen = choose_genre_sleeve(genre, candidates)
+            _save_checkpoint(run, genre, "score", chosen=_chosen_to_json(chosen), version=None)
+        if chosen:
+            publish_genre_sleeve(genre, chosen, run=run)
+            published.append(genre)
+
+    failed: list[str] = []
+    for genre in genres:
+        if genre in to_fetch:
+            continue
+        try:
+            finish(genre, None)
+        except Exception as exc:
+            print(f"Refresh failed for genre={genre}: {exc!r}")
+            failed.append(genre)
+
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(to_fetch))), thread_name_prefix="genre-refresh") as pool:
+            futures = {pool.submit(fetch, position, genre): genre for position, genre in enumerate(to_fetch)}
+            for future in as_completed(futures):
+                genre = futures[future]
+                try:
+                    finish(genre, future.result())
+                except Exception as exc:
+                    print(f"Refresh failed for genre={genre}: {exc!r}")
+                    failed.append(genre)
 
+    if published:
+        # One rebuild for the whole run: each rebuild hydrates every sleeve against the run's own Spotify budget.
+        try:
+            refresh_sleeves_payload()
+        except Exception as exc:
+            print(f"Sleeves payload rebuild failed; readers will rebuild it on demand: {exc!r}")
+
+    run.status = "failed" if failed else "completed"
+    run.finished_at = timezone.now()
+    run.save(update_fields=["status", "finished_at"])
+
+    print(f"Weekly sleeve refresh finished in {time.monotonic() - started:.1f}s ({len(genres) - len(failed)}/{len(genres)} genres ok)")
+    if failed:
+        raise RuntimeError(
+            f"Weekly sleeve refresh failed for: {', '.join(failed)}. "
+            f"Rerun with --resume {run.pk} to carry on from the saved checkpoints."
+        )
+    return run
 
 
 def main() -> None:
@@ -963,29 +1178,79 @@ def main() -> None:
     parser.add_argument(
         "--delay-between-genres-seconds",
         type=float,
-        default=20.0,
-        help="delay between each genre refresh to spread Spotify requests",
+        default=0.0,
+        help="stagger between the start of each genre's fetch; requests are already paced by the shared rate limit",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=GENRE_REFRESH_CONCURRENCY,
+        help="number of genres fetched at the same time",
     )
     parser.add_argument(
         "--local-only",
         action="store_true",
         help="skip Spotify entirely and refresh sleeves from local Song catalog only",
     )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="carry on an interrupted run from its checkpoints (default: the latest failed run; pass an id "
+        "to resume a run that crashed while still marked running); genres, limit, market and local-only "
+        "come from that run",
+    )
+    parser.add_argument(
+        "--from-stage",
+        choices=REFRESH_STAGES,
+        help="with --resume, redo this stage and the ones after it instead of reusing their checkpoints",
+    )
     args = parser.parse_args()
 
+    if args.from_stage and not args.resume:
+        parser.error("--from-stage requires --resume")
+    if args.resume and args.daily:
+        parser.error("--resume cannot be combined with --daily")
+    if args.resume:
+        if args.resume != "latest" and not args.resume.isdigit():
+            parser.error(f"--resume expects a run id, got '{args.resume}'")
+        run = _resumable_run(args.resume)
+        if run is None:
+            parser.error(
+                f"no refresh run to resume ({args.resume}); runs still marked running must be resumed by id"
+            )
+        refresh_all_genres(
+            genres=run.genres,
+            limit=run.limit,
+            market=run.market,
+            local_only=run.local_only,
+            delay_between_genres_seconds=args.delay_between_genres_seconds,
+            concurrency=args.concurrency,
+            run=run,
+            from_stage=args.from_stage,
+        )
+        return
+
     if args.daily:
         while True:
             next_run = _next_daily_run(args.daily_at)
             seconds_until = max((next_run - datetime.now()).total_seconds(), 0.0)
             print(f"Next daily sleeve refresh run at {next_run.isoformat()} (in {int(seconds_until)}s)")
             time.sleep(seconds_until)
-            refresh_all_genres(
-                genres=args.genres,
-                limit=args.limit,
-                market=args.market,
-                local_only=args.local_only,
-                delay_between_genres_seconds=args.delay_between_genres_seconds,
-            )
+            try:
+                refresh_all_genres(
+                    genres=args.genres,
+                    limit=args.limit,
+                    market=args.market,
+                    local_only=args.local_only,
+                    delay_between_genres_seconds=args.delay_between_genres_seconds,
+                    concurrency=args.concurrency,
+                )
+            except Exception as exc:
+                # One bad day (e.g. a long Spotify Retry-After) must not stop the daemon; the message names
+                # the run to pass to --resume.
+                print(f"Daily sleeve refresh failed: {exc}")
     else:
         refresh_all_genres(
             genres=args.genres,
@@ -993,6 +1258,7 @@ def main() -> None:
             market=args.market,
             local_only=args.local_only,
             delay_between_genres_seconds=args.delay_between_genres_seconds,
+            concurrency=args.concurrency,
         )
 
 
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Monte Carlo check of sleeve and reroll drop rates, plus a per-draw latency benchmark.
+
+Runs draws against the sleeves currently published in the database and compares
+observed rarity frequencies with the ones implied by the weights. NumPy is used
+for the bulk sleeve draws when it is installed; otherwise the pure-Python alias
+sampler is used (slower, same numbers).
+
+Usage (from the `server` directory):
+  python simulate_sleeve_odds.py
+  python simulate_sleeve_odds.py --sleeve pop-weekly --draws 5000000 --seed 7
+  python simulate_sleeve_odds.py --reroll Common,Common,Common --reroll Epic,Legendary,Rare
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the fallback path is plain Python.
+    np = None
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.models import Sleeve  # noqa: E402
+from api.sleeve_sampler import AliasTable, SleeveOutcome, _entry_weight, sleeve_alias_table  # noqa: E402
+from api.sleeve_versions import active_contents  # noqa: E402
+from api.views import (  # noqa: E402
+    RARITY_RANK,
+    _rarity_from_apple_catalog_position,
+    _reroll_rarity_weights,
+    _roll_rarity_from_inputs,
+)
+
+RARITIES = tuple(sorted(RARITY_RANK, key=RARITY_RANK.get))
+Z_95 = 1.959963984540054
+
+
+def wilson_interval(hits: int, trials: int, z: float = Z_95) -> tuple[float, float]:
+    if trials <= 0:
+        return 0.0, 0.0
+    p = hits / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def print_rarity_report(expected: dict[str, float], observed: Counter, trials: int) -> int:
+    """Print one row per rarity and return how many expected values fall outside the 95% interval."""
+    misses = 0
+    print(f"  {'rarity':<10} {'expected':>9} {'observed':>9} {'95% CI':>21}")
+    for rarity in RARITIES:
+        share = expected.get(rarity, 0.0)
+        hits = observed.get(rarity, 0)
+        if share == 0.0 and hits == 0:
+            continue
+        low, high = wilson_interval(hits, trials)
+        flag = ""
+        if not low <= share <= high:
+            flag = "  <-- outside CI"
+            misses += 1
+        print(f"  {rarity:<10} {share:>9.4%} {hits / trials:>9.4%}   [{low:.4%}, {high:.4%}]{flag}")
+    return misses
+
+
+def expected_sleeve_rarities(weighted: list[tuple[SleeveOutcome, float]]) -> dict[str, float]:
+    weights = [max(0.0, weight) for _, weight in weighted]
+    total = sum(weights)
+    if total <= 0:
+        return {weighted[0][0].rarity: 1.0}
+    shares: dict[str, float] = {}
+    for (outcome, _), weight in zip(weighted, weights):
+        shares[outcome.rarity] = shares.get(outcome.rarity, 0.0) + weight / total
+    return shares
+
+
+def simulate_alias_draws(table: AliasTable, draws: int, seed: int | None) -> Counter:
+    if np is None:
+        rng = random.Random(seed)
+        return Counter(outcome.rarity for outcome in table.draw_many(draws, rng))
+
+    rng = np.random.default_rng(seed)
+    size = len(table.outcomes)
+    probabilities = np.asarray(table.probabilities)
+    aliases = np.asarray(table.aliases)
+    rarity_codes = np.asarray([RARITIES.index(outcome.rarity) for outcome in table.outcomes])
+
+    counts = np.zeros(len(RARITIES), dtype=np.int64)
+    chunk = 1_000_000
+    remaining = draws
+    while remaining > 0:
+        batch = min(chunk, remaining)
+        scaled = rng.random(batch) * size
+        columns = scaled.astype(np.int64)
+        picked = np.where(scaled - columns < probabilities[columns], columns, aliases[columns])
+        counts += np.bincount(rarity_codes[picked], minlength=len(RARITIES))
+        remaining -= batch
+    return Counter({rarity: int(counts[index]) for index, rarity in enumerate(RARITIES)})
+
+
+def linear_sampler(weighted: list[tuple[SleeveOutcome, float]]) -> Callable[[random.Random], SleeveOutcome]:
+    """The cumulative-subtraction loop open_sleeve used before the alias table."""
+    total = sum(weight for _, weight in weighted)
+
+    def draw(rng: random.Random) -> SleeveOutcome:
+        roll = rng.random() * total
+        chosen = weighted[-1][0]
+        for outcome, weight in weighted:
+            roll -= weight
+            if roll <= 0:
+                chosen = outcome
+                break
+        return chosen
+
+    return draw
+
+
+def time_per_draw(draw: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        draw()
+    return (time.perf_counter() - started) / iterations
+
+
+def run_sleeve(sleeve: Sleeve, draws: int, bench_draws: int, seed: int | None) -> int:
+    rows = active_contents(sleeve).order_by("id").values_list("song_id", "rarity", "weight")
+    weighted = [
+        (SleeveOutcome(song_id=song_id, rarity=rarity), _entry_weight(weight, rarity))
+        for song_id, rarity, weight in rows
+    ]
+    print(f"\nSleeve {sleeve.id} ({sleeve.name}) - {len(weighted)} songs, {draws:,} draws")
+    if not weighted:
+        print("  empty, skipped")
+        return 0
+
+    table = sleeve_alias_table(sleeve)
+    misses = print_rarity_report(expected_sleeve_rarities(weighted), simulate_alias_draws(table, draws, seed), draws)
+
+    rng = random.Random(seed)
+    linear = linear_sampler(weighted)
+    linear_cost = time_per_draw(lambda: linear(rng), bench_draws)
+    alias_cost = time_per_draw(lambda: table.draw(rng), bench_draws)
+    batch_started = time.perf_counter()
+    table.draw_many(bench_draws, rng)
+    batch_cost = (time.perf_counter() - batch_started) / bench_draws
+    print(
+        f"  per draw: linear {linear_cost * 1e9:,.0f} ns, alias {alias_cost * 1e9:,.0f} ns, "
+        f"alias draw_many {batch_cost * 1e9:,.0f} ns"
+    )
+    return misses
+
+
+def run_reroll(input_rarities: list[str], draws: int, seed: int | None) -> int:
+    weights = _reroll_rarity_weights(input_rarities)
+    total = sum(weights.values())
+    expected = {rarity: weight / total for rarity, weight in weights.items()}
+
+    print(f"\nReroll of {', '.join(input_rarities)} - {draws:,} draws")
+    random.seed(seed)
+    started = time.perf_counter()
+    observed = Counter(_roll_rarity_from_inputs(input_rarities) for _ in range(draws))
+    elapsed = time.perf_counter() - started
+    misses = print_rarity_report(expected, observed, draws)
+    print(f"  per draw: {elapsed / draws * 1e9:,.0f} ns")
+    return misses
+
+
+def run_apple_positions(catalog_sizes: list[int], draws: int, seed: int | None) -> int:
+    """Rarity bands when the matched track lands uniformly anywhere in the Apple catalog."""
+    rng = random.Random(seed)
+    misses = 0
+    for size in catalog_sizes:
+        exact = Counter(_rarity_from_apple_catalog_position(position, size) for position in range(size))
+        expected = {rarity: hits / size for rarity, hits in exact.items()}
+        observed = Counter(_rarity_from_apple_catalog_position(rng.randrange(size), size) for _ in range(draws))
+        print(f"\nApple catalog position, {size} tracks - {draws:,} draws")
+        misses += print_rarity_report(expected, observed, draws)
+    return misses
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sleeve", action="append", default=[], help="Sleeve id to simulate (repeatable, default all)")
+    parser.add_argument("--draws", type=int, default=1_000_000, help="Monte Carlo draws per sleeve")
+    parser.add_argument("--bench-draws", type=int, default=200_000, help="Draws used for per-draw latency")
+    parser.add_argument("--reroll", action="append", default=[], help="Comma-separated input rarities (repeatable)")
+    parser.add_argument("--reroll-draws", type=int, default=200_000)
+    parser.add_argument("--catalog-size", type=int, action="append", default=[], help="Apple catalog sizes to check")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    print(f"Sampler backend: {'numpy ' + np.__version__ if np is not None else 'pure python'}")
+
+    sleeves = Sleeve.objects.order_by("id")
+    if args.sleeve:
+        sleeves = sleeves.filter(id__in=args.sleeve)
+
+    misses = 0
+    for sleeve in sleeves:
+        misses += run_sleeve(sleeve, args.draws, args.bench_draws, args.seed)
+
+    reroll_inputs = args.reroll or ["Common,Common,Common", "Rare,Rare,Rare", "Legendary,Legendary,Legendary"]
+    for raw in reroll_inputs:
+        input_rarities = [part.strip() for part in raw.split(",") if part.strip()]
+        misses += run_reroll(input_rarities, args.reroll_draws, args.seed)
+
+    misses += run_apple_positions(args.catalog_size or [25, 60, 120], args.reroll_draws, args.seed)
+
+    # About 1 in 20 rows lands outside a 95% interval by chance alone.
+    print(f"\n{misses} expected value(s) outside their 95% interval.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
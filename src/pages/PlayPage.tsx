@@ -4,7 +4,7 @@ import GlassPanel from "../components/GlassPanel";
 import { SongCard } from "../components/SongCard";
 import { LoadingSpinner } from "../components/LoadingSpinner";
 import { api } from "../services/api";
-import { playSongPreview, stopSongPreview } from "../services/songPreview";
+import { playSongPreview, prefetchSongPreviews, stopSongPreview } from "../services/songPreview";
 import { useAuth } from "../context/useAuth";
 import type { OwnedSong } from "../types/song";
 import type { Sleeve } from "../types/sleeve";
@@ -562,6 +562,11 @@ export function PlayPage() {
     void playSongPreview(hoveredSong);
   }, [hoveredSong, openState, overlayOpen]);
 
+  useEffect(() => {
+    if (!current?.contents?.length) return;
+    void prefetchSongPreviews(current.contents);
+  }, [current]);
+
 
   async function handleOpen() {
     if (!current) return;
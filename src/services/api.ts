@@ -66,6 +66,14 @@ export const api = {
     });
   },
 
+  async openSleeves(sleeveId: string, count: number): Promise<OwnedSong[]> {
+    return await fetchJson<OwnedSong[]>(`/api/sleeves/${encodeURIComponent(sleeveId)}/open`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ count }),
+    });
+  },
+
   async getSession(): Promise<AuthUser | null> {
     try {
       const data = await fetchJson<{ user: AuthUser | null }>("/api/auth/session/");
@@ -1,6 +1,7 @@
 import type { OwnedSong, Song } from "../types/song";
 
-type PreviewTarget = Pick<Song, "title" | "artist"> | Pick<OwnedSong, "title" | "artist">;
+type PreviewTarget = (Pick<Song, "title" | "artist"> | Pick<OwnedSong, "title" | "artist">) &
+  Partial<Pick<OwnedSong, "id" | "songId">>;
 type PlaySongPreviewOptions = {
   volume?: number;
   fadeInMs?: number;
@@ -21,6 +22,9 @@ type PreviewQueryPlan = {
 
 const previewCache = new Map<string, string>();
 const inflightPreviewLookups = new Map<string, Promise<string | null>>();
+// Backend answers by song id; null means the server looked and found no preview.
+const serverPreviewCache = new Map<string, string | null>();
+const SERVER_PREVIEW_BATCH_LIMIT = 100;
 let activeAudio: HTMLAudioElement | null = null;
 let playRequestId = 0;
 let activeFadeRafId: number | null = null;
@@ -193,10 +197,68 @@ export function subscribeSongPreviewLevel(listener: PreviewLevelListener) {
   };
 }
 
+function songIdFor(song: PreviewTarget) {
+  // Owned songs carry their own id; the canonical song id is songId.
+  const songId = song.songId ?? song.id;
+  return songId ? String(songId) : null;
+}
+
+/**
+ * Ask the backend for the stored preview. Returns undefined when the server could not
+ * answer (unknown song, provider unavailable, network error) so the caller can fall back.
+ */
+async function lookupServerPreview(songId: string): Promise<string | null | undefined> {
+  if (serverPreviewCache.has(songId)) return serverPreviewCache.get(songId);
+
+  try {
+    const response = await fetch(`/api/songs/${encodeURIComponent(songId)}/preview`, { credentials: "include" });
+    if (!response.ok) return undefined;
+    const data = (await response.json()) as { previewUrl?: string | null };
+    const previewUrl = data.previewUrl ?? null;
+    serverPreviewCache.set(songId, previewUrl);
+    return previewUrl;
+  } catch {
+    return undefined;
+  }
+}
+
+/** Warm the preview lookup for a set of songs (e.g. a sleeve's contents) in one request. */
+export async function prefetchSongPreviews(songs: PreviewTarget[]): Promise<void> {
+  const songIds = [...new Set(songs.map(songIdFor).filter((id): id is string => Boolean(id)))].filter(
+    (id) => !serverPreviewCache.has(id),
+  );
+
+  for (let start = 0; start < songIds.length; start += SERVER_PREVIEW_BATCH_LIMIT) {
+    const batch = songIds.slice(start, start + SERVER_PREVIEW_BATCH_LIMIT);
+    try {
+      const params = new URLSearchParams({ ids: batch.join(",") });
+      const response = await fetch(`/api/songs/previews/?${params.toString()}`, { credentials: "include" });
+      if (!response.ok) return;
+      const data = (await response.json()) as { previews?: Record<string, string | null>; unresolved?: string[] };
+      const unresolved = new Set(data.unresolved ?? []);
+      for (const [songId, previewUrl] of Object.entries(data.previews ?? {})) {
+        if (previewUrl || !unresolved.has(songId)) serverPreviewCache.set(songId, previewUrl ?? null);
+      }
+    } catch {
+      return;
+    }
+  }
+}
+
 async function lookupApplePreview(song: PreviewTarget): Promise<string | null> {
   const cacheKey = cacheKeyFor(song);
   const cached = previewCache.get(cacheKey);
   if (cached) return cached;
+
+  const songId = songIdFor(song);
+  if (songId) {
+    const serverPreview = await lookupServerPreview(songId);
+    if (serverPreview !== undefined) {
+      if (serverPreview) previewCache.set(cacheKey, serverPreview);
+      return serverPreview;
+    }
+  }
+
   const inflight = inflightPreviewLookups.get(cacheKey);
   if (inflight) return inflight;
 